@@ -0,0 +1,269 @@
+import asyncio
+import gc
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Type
+
+from textblob import TextBlob
+
+from cache import LRUCache, text_key
+from keywords import candidate_terms, frequency_keywords
+from metrics import analysis_duration, analysis_texts
+
+logger = logging.getLogger(__name__)
+
+# Executor configuration
+ANALYSIS_EXECUTOR = os.environ.get('ANALYSIS_EXECUTOR', 'process')
+ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'textblob')
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', '0')) or os.cpu_count() or 1
+ANALYSIS_CHUNK_SIZE = int(os.environ.get('ANALYSIS_CHUNK_SIZE', '64'))
+# forkserver starts workers from a clean single-threaded process that has already imported
+# FORKSERVER_PRELOAD; fork would copy the web process's Motor and bcrypt threads' locks into them
+ANALYSIS_START_METHOD = os.environ.get('ANALYSIS_START_METHOD', 'forkserver')
+FORKSERVER_PRELOAD = ['analysis', 'lexicon_engine']
+
+# Result cache configuration (ANALYSIS_CACHE_ENTRIES=0 disables it)
+ANALYSIS_CACHE_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_ENTRIES', '100000'))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+ANALYSIS_CACHE_TTL = float(os.environ.get('ANALYSIS_CACHE_TTL', '0'))
+
+# ============ SENTIMENT ANALYSIS ============
+
+ENGINES = ('textblob', 'lexicon')
+
+def label_for(polarity: float) -> str:
+    if polarity > 0.1:
+        return "positive"
+    elif polarity < -0.1:
+        return "negative"
+    return "neutral"
+
+def build_analysis(polarity: float, subjectivity: float, words: List[str]) -> dict:
+    # Term counts travel with the result so the web process can re-rank them by TF-IDF
+    terms = candidate_terms(words)
+    return {
+        'sentiment': label_for(polarity),
+        'polarity': round(polarity, 3),
+        'subjectivity': round(subjectivity, 3),
+        'keywords': frequency_keywords(terms),
+        'terms': terms
+    }
+
+def analyze_sentiment(text: str) -> dict:
+    blob = TextBlob(text)
+    return build_analysis(blob.sentiment.polarity, blob.sentiment.subjectivity, blob.words.lower())
+
+def analyze_lexicon_batch(texts: List[str]) -> List[dict]:
+    from lexicon_engine import get_lexicon, words_from_tokens
+
+    polarity, subjectivity, tokens = get_lexicon().score_batch(texts)
+    return [
+        build_analysis(float(p), float(s), words_from_tokens(t))
+        for p, s, t in zip(polarity, subjectivity, tokens)
+    ]
+
+def analyze_batch(texts: List[str], engine: str = 'textblob') -> List[dict]:
+    if engine == 'lexicon':
+        return analyze_lexicon_batch(texts)
+    return [analyze_sentiment(text) for text in texts]
+
+def analyze_one(text: str, engine: str = 'textblob') -> dict:
+    return analyze_batch([text], engine)[0]
+
+WARMUP_TEXT = "Warm up the analyzer."
+
+def preload(engine: Optional[str] = None):
+    # Load the engine's lexicons and tokenizer data up front (shared with workers under ANALYSIS_START_METHOD=fork)
+    analyze_one(WARMUP_TEXT, engine or ANALYSIS_ENGINE)
+    # Preloaded objects move to the permanent generation, so collections in children never write to their pages
+    gc.freeze()
+
+def _warm_worker(hold: float) -> int:
+    # Holding the worker briefly makes every worker in the pool take one of the warmup tasks
+    time.sleep(hold)
+    return os.getpid()
+
+def _init_worker():
+    # Pay the engine's lazy lexicon/tokenizer loading once per worker process (a no-op when preloaded and forked)
+    try:
+        analyze_one(WARMUP_TEXT, ANALYSIS_ENGINE)
+    except Exception as e:
+        logger.warning(f"Analysis worker warmup failed: {str(e)}")
+
+# ============ EXECUTORS ============
+
+def create_result_cache() -> LRUCache:
+    return LRUCache(ANALYSIS_CACHE_ENTRIES, max_bytes=ANALYSIS_CACHE_MAX_BYTES, ttl=ANALYSIS_CACHE_TTL)
+
+
+class AnalysisExecutor:
+    """Runs analyze_sentiment somewhere that does not block the event loop.
+
+    Results are memoized in a content-addressed LRU cache shared by every caller;
+    subclasses only implement _run_one/_run_many for texts that miss it.
+    """
+
+    name = 'base'
+
+    def __init__(self, cache: Optional[LRUCache] = None):
+        self.cache = cache if cache is not None else create_result_cache()
+        self._queued = 0
+        self._completed = 0
+
+    async def analyze(self, text: str, engine: Optional[str] = None) -> dict:
+        engine = engine or ANALYSIS_ENGINE
+        key = (engine, text_key(text))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        with analysis_duration.time(self.name, engine, 'one'):
+            result = await self._run_one(text, engine)
+        analysis_texts.inc(engine)
+        self.cache.set(key, result)
+        return dict(result)
+
+    async def analyze_many(self, texts: List[str], engine: Optional[str] = None) -> List[dict]:
+        engine = engine or ANALYSIS_ENGINE
+        keys = [(engine, text_key(text)) for text in texts]
+        results: Dict[tuple, dict] = {}
+        missing: Dict[tuple, str] = {}
+        for key, text in zip(keys, texts):
+            if key in results or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing[key] = text
+        if missing:
+            with analysis_duration.time(self.name, engine, 'many'):
+                scored = await self._run_many(list(missing.values()), engine)
+            analysis_texts.inc(engine, amount=len(missing))
+            for key, result in zip(missing, scored):
+                self.cache.set(key, result)
+                results[key] = result
+        return [dict(results[key]) for key in keys]
+
+    async def _run_one(self, text: str, engine: str) -> dict:
+        return (await self._run_many([text], engine))[0]
+
+    async def _run_many(self, texts: List[str], engine: str) -> List[dict]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.name,
+            'engine': ANALYSIS_ENGINE,
+            'workers': 1,
+            'queue_depth': self._queued,
+            'completed': self._completed,
+            'cache': self.cache.stats()
+        }
+
+    async def warm(self) -> int:
+        """Make the executor ready to score without cold-start latency; returns the number of warm workers."""
+        await self._run_one(WARMUP_TEXT, ANALYSIS_ENGINE)
+        return 1
+
+    def shutdown(self):
+        pass
+
+
+class InlineExecutor(AnalysisExecutor):
+    """Scores on the calling thread. Only meant for development and debugging."""
+
+    name = 'inline'
+
+    async def _run_many(self, texts: List[str], engine: str) -> List[dict]:
+        results = analyze_batch(texts, engine)
+        self._completed += len(results)
+        return results
+
+
+class ProcessPoolAnalysisExecutor(AnalysisExecutor):
+    """Spreads scoring over a pool of worker processes, one per core by default."""
+
+    name = 'process'
+
+    def __init__(
+        self,
+        workers: int = ANALYSIS_WORKERS,
+        chunk_size: int = ANALYSIS_CHUNK_SIZE,
+        cache: Optional[LRUCache] = None
+    ):
+        super().__init__(cache)
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self._pool = self._create_pool()
+
+    def _create_pool(self, start_method: str = ANALYSIS_START_METHOD) -> ProcessPoolExecutor:
+        methods = multiprocessing.get_all_start_methods()
+        if start_method not in methods:
+            start_method = 'spawn'
+        context = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker)
+
+    async def warm(self) -> int:
+        # One concurrent task per worker starts them all now and waits until each has run its initializer
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _warm_worker, 0.05) for _ in range(self.workers)
+        ))
+        return len(set(pids))
+
+    async def _submit(self, fn, size: int, *args):
+        loop = asyncio.get_running_loop()
+        self._queued += size
+        try:
+            return await loop.run_in_executor(self._pool, fn, *args)
+        except BrokenProcessPool:
+            logger.error("Analysis worker pool broke, restarting it")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            # By now this process runs Motor and hashing threads, so a replacement pool is never forked from it
+            start_method = 'forkserver' if ANALYSIS_START_METHOD == 'fork' else ANALYSIS_START_METHOD
+            self._pool = self._create_pool(start_method)
+            raise
+        finally:
+            self._queued -= size
+            self._completed += size
+
+    async def _run_one(self, text: str, engine: str) -> dict:
+        # Fast path: a single text goes straight to a worker without batching
+        return await self._submit(analyze_one, 1, text, engine)
+
+    async def _run_many(self, texts: List[str], engine: str) -> List[dict]:
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        batches = await asyncio.gather(*(self._submit(analyze_batch, len(chunk), chunk, engine) for chunk in chunks))
+        return [result for batch in batches for result in batch]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['workers'] = self.workers
+        stats['chunk_size'] = self.chunk_size
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+EXECUTORS: Dict[str, Type[AnalysisExecutor]] = {
+    'inline': InlineExecutor,
+    'process': ProcessPoolAnalysisExecutor,
+}
+
+def register_executor(name: str, executor_cls: Type[AnalysisExecutor]):
+    EXECUTORS[name] = executor_cls
+
+def create_executor(name: Optional[str] = None) -> AnalysisExecutor:
+    if ANALYSIS_ENGINE not in ENGINES:
+        raise ValueError(f"Unknown analysis engine: {ANALYSIS_ENGINE}")
+    name = name or ANALYSIS_EXECUTOR
+    if name not in EXECUTORS:
+        raise ValueError(f"Unknown analysis executor: {name}")
+    return EXECUTORS[name]()
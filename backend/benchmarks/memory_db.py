@@ -0,0 +1,715 @@
+"""In-memory stand-in for the parts of the Motor API the backend uses.
+
+Collections keep documents in insertion order and build hash lookups on the
+equality fields of the filters they actually see, so upserts into the views
+stay O(1) while seeding millions of rows. Query, update and aggregation
+support covers the operators used by server.py, rollups.py and keywords.py;
+anything else raises NotImplementedError rather than silently mismatching.
+"""
+import itertools
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+_MISSING = object()
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, datetime):
+        return _bson_datetime(value)
+    return value
+
+
+def _bson_datetime(value: datetime) -> datetime:
+    # BSON keeps UTC milliseconds and Motor hands datetimes back naive, so stored values and operands match that
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: dict, path: str, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc: dict, path: str):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _sort_key(value):
+    # Mongo's cross-type order, reduced to the types the backend stores
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, bytes):
+        return (4, bytes(value))
+    if isinstance(value, ObjectId):
+        return (5, str(value))
+    if isinstance(value, datetime):
+        return (6, value)
+    return (3, str(value))
+
+
+BSON_TYPES = {'string': str, 'date': datetime, 'binData': bytes, 'objectId': ObjectId}
+
+
+def _type_name(value) -> str:
+    if value is _MISSING:
+        return 'missing'
+    for name, kind in BSON_TYPES.items():
+        if isinstance(value, kind):
+            return name
+    return type(value).__name__
+
+
+# ============ QUERIES ============
+
+def _compare(value, op: str, operand) -> bool:
+    if op == '$eq':
+        return _equals(value, operand)
+    if op == '$ne':
+        return not _equals(value, operand)
+    if op == '$in':
+        return any(_equals(value, candidate) for candidate in operand)
+    if op == '$nin':
+        return not any(_equals(value, candidate) for candidate in operand)
+    if op == '$exists':
+        return (value is not _MISSING) == bool(operand)
+    if op == '$regex':
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if op == '$type':
+        return value is not _MISSING and _type_name(value) == operand
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        if value is _MISSING or value is None or _sort_key(value)[0] != _sort_key(operand)[0]:
+            return False
+        if op == '$gt':
+            return value > operand
+        if op == '$gte':
+            return value >= operand
+        if op == '$lt':
+            return value < operand
+        return value <= operand
+    raise NotImplementedError(f"Query operator {op}")
+
+
+def _equals(value, operand) -> bool:
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    if value is _MISSING:
+        return operand is None
+    return value == operand
+
+
+def _match_field(value, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        options = condition.get('$options', '')
+        for op, operand in condition.items():
+            if op == '$options':
+                continue
+            if op == '$regex' and 'i' in options:
+                operand = re.compile(operand, re.IGNORECASE)
+            if not _compare(value, op, operand):
+                return False
+        return True
+    if isinstance(condition, re.Pattern):
+        return isinstance(value, str) and condition.search(value) is not None
+    return _equals(value, condition)
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == '$or':
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == '$and':
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(doc, clause) for clause in condition):
+                return False
+        elif key.startswith('$'):
+            raise NotImplementedError(f"Query operator {key}")
+        elif not _match_field(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _equality_fields(query: Optional[dict]) -> Tuple[str, ...]:
+    fields = []
+    for key, condition in (query or {}).items():
+        if key.startswith('$') or isinstance(condition, (dict, list, re.Pattern)):
+            continue
+        fields.append(key)
+    return tuple(sorted(fields))
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return _copy(doc)
+    include_id = projection.get('_id', 1)
+    fields = {k: v for k, v in projection.items() if k != '_id'}
+    if fields and all(fields.values()):
+        out = {}
+        if include_id and '_id' in doc:
+            out['_id'] = doc['_id']
+        for path in fields:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(out, path, _copy(value))
+        return out
+    out = _copy(doc)
+    for path in fields:
+        _unset(out, path)
+    if not include_id:
+        out.pop('_id', None)
+    return out
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def _sorted(docs: List[dict], spec: List[Tuple[str, int]]) -> List[dict]:
+    for field, direction in reversed(spec):
+        docs.sort(key=lambda d: _sort_key(_get(d, field)), reverse=direction < 0)
+    return docs
+
+
+# ============ UPDATES ============
+
+def _apply_update(doc: dict, update: dict, inserting: bool) -> set:
+    if not any(k.startswith('$') for k in update):
+        raise ValueError("update only works with $ operators")
+    changed = set()
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == '$set':
+                _set(doc, path, _copy(value))
+            elif op == '$setOnInsert':
+                if not inserting:
+                    continue
+                _set(doc, path, _copy(value))
+            elif op == '$inc':
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == '$unset':
+                _unset(doc, path)
+            else:
+                raise NotImplementedError(f"Update operator {op}")
+            changed.add(path.split('.')[0])
+    return changed
+
+
+def _upsert_seed(query: dict) -> dict:
+    return {k: _copy(v) for k, v in query.items() if not k.startswith('$') and not isinstance(v, dict)}
+
+
+# ============ AGGREGATION ============
+
+def _evaluate(doc: dict, expr):
+    if isinstance(expr, str) and expr.startswith('$'):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict):
+        if len(expr) == 1 and next(iter(expr)).startswith('$'):
+            op, args = next(iter(expr.items()))
+            if op in ('$substr', '$substrBytes', '$substrCP'):
+                value, start, length = (_evaluate(doc, a) for a in args)
+                value = '' if value is None else str(value)
+                return value[start:] if length < 0 else value[start:start + length]
+            if op == '$cond':
+                condition, then, otherwise = args
+                return _evaluate(doc, then if _evaluate(doc, condition) else otherwise)
+            if op == '$eq':
+                left, right = (_evaluate(doc, a) for a in args)
+                return left == right
+            if op == '$type':
+                value = _get(doc, args[1:]) if isinstance(args, str) and args.startswith('$') else _evaluate(doc, args)
+                return _type_name(value)
+            if op == '$dateToString':
+                value = _evaluate(doc, args['date'])
+                return value.strftime(args['format']) if isinstance(value, datetime) else None
+            raise NotImplementedError(f"Expression operator {op}")
+        return {k: _evaluate(doc, v) for k, v in expr.items()}
+    return expr
+
+
+def _group(docs: Iterable[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, dict] = {}
+    counts: Dict[Any, int] = {}
+    accumulators = {k: v for k, v in spec.items() if k != '_id'}
+    for doc in docs:
+        key = _evaluate(doc, spec['_id'])
+        hashable = repr(key)
+        group = groups.get(hashable)
+        if group is None:
+            group = groups[hashable] = {'_id': key}
+            for field, acc in accumulators.items():
+                op = next(iter(acc))
+                group[field] = None if op in ('$min', '$max', '$first') else 0
+            counts[hashable] = 0
+        counts[hashable] += 1
+        for field, acc in accumulators.items():
+            op, arg = next(iter(acc.items()))
+            value = _evaluate(doc, arg)
+            if op in ('$sum', '$avg'):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    group[field] += value
+            elif op == '$min':
+                if value is not None and (group[field] is None or value < group[field]):
+                    group[field] = value
+            elif op == '$max':
+                if value is not None and (group[field] is None or value > group[field]):
+                    group[field] = value
+            elif op == '$first':
+                if counts[hashable] == 1:
+                    group[field] = value
+            else:
+                raise NotImplementedError(f"Accumulator {op}")
+    for hashable, group in groups.items():
+        for field, acc in accumulators.items():
+            if next(iter(acc)) == '$avg':
+                group[field] = group[field] / counts[hashable]
+    return list(groups.values())
+
+
+def _unwind(docs: Iterable[dict], path) -> Iterable[dict]:
+    field = (path['path'] if isinstance(path, dict) else path)[1:]
+    for doc in docs:
+        values = _get(doc, field)
+        if not isinstance(values, list):
+            if values is not _MISSING and values is not None:
+                yield doc
+            continue
+        for value in values:
+            out = dict(doc)
+            _set(out, field, value)
+            yield out
+
+
+def run_pipeline(docs: Iterable[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (op, spec), = stage.items()
+        if op == '$match':
+            spec = _copy(spec)
+            docs = [d for d in docs if matches(d, spec)]
+        elif op == '$project':
+            docs = [project(d, spec) for d in docs]
+        elif op == '$group':
+            docs = _group(docs, spec)
+        elif op == '$unwind':
+            docs = list(_unwind(docs, spec))
+        elif op == '$sort':
+            docs = _sorted(list(docs), _normalize_sort(spec))
+        elif op == '$skip':
+            docs = list(docs)[spec:]
+        elif op == '$limit':
+            docs = list(docs)[:spec]
+        elif op == '$count':
+            docs = [{spec: len(list(docs))}]
+        else:
+            raise NotImplementedError(f"Pipeline stage {op}")
+    return [_copy(d) for d in docs]
+
+
+# ============ RESULTS ============
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count=0):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self):
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_count = 0
+        self.upserted_ids: Dict[int, Any] = {}
+        self.acknowledged = True
+
+
+# ============ CURSORS ============
+
+class MemoryCursor:
+    def __init__(self, collection: 'MemoryCollection', query: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key_or_list, direction=None) -> 'MemoryCursor':
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, n: int) -> 'MemoryCursor':
+        self._skip = n
+        return self
+
+    def limit(self, n: int) -> 'MemoryCursor':
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int) -> 'MemoryCursor':
+        return self
+
+    def _results(self) -> Iterable[dict]:
+        docs = self._collection._find(self._query)
+        if self._sort:
+            docs = iter(_sorted(list(docs), self._sort))
+        stop = self._skip + self._limit if self._limit else None
+        for doc in itertools.islice(docs, self._skip, stop):
+            yield project(doc, self._projection)
+
+    def __aiter__(self):
+        self._iter = self._results()
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return list(itertools.islice(self._results(), length))
+
+
+class AggregateCursor:
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self._docs[:length] if length else list(self._docs)
+
+
+# ============ COLLECTIONS ============
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+        # equality fields -> field values -> {_id: doc}
+        self._lookups: Dict[Tuple[str, ...], Dict[tuple, Dict[Any, dict]]] = {}
+        self._unique: List[Tuple[str, ...]] = []
+
+    def _lookup_key(self, fields: Tuple[str, ...], doc: dict) -> Optional[tuple]:
+        key = tuple(_get(doc, f) for f in fields)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _lookup(self, fields: Tuple[str, ...]) -> Dict[tuple, Dict[Any, dict]]:
+        lookup = self._lookups.get(fields)
+        if lookup is None:
+            lookup = self._lookups[fields] = {}
+            for doc in self._docs.values():
+                key = self._lookup_key(fields, doc)
+                lookup.setdefault(key, {})[doc['_id']] = doc
+        return lookup
+
+    def _index(self, doc: dict, fields_changed: Optional[set] = None):
+        for fields, lookup in self._lookups.items():
+            if fields_changed is None or fields_changed.intersection(f.split('.')[0] for f in fields):
+                lookup.setdefault(self._lookup_key(fields, doc), {})[doc['_id']] = doc
+
+    def _unindex(self, doc: dict, fields_changed: Optional[set] = None):
+        for fields, lookup in self._lookups.items():
+            if fields_changed is None or fields_changed.intersection(f.split('.')[0] for f in fields):
+                bucket = lookup.get(self._lookup_key(fields, doc))
+                if bucket is not None:
+                    bucket.pop(doc['_id'], None)
+                    if not bucket:
+                        lookup.pop(self._lookup_key(fields, doc), None)
+
+    def _find(self, query: Optional[dict]) -> Iterable[dict]:
+        query = _copy(query)
+        fields = _equality_fields(query)
+        if fields:
+            lookup = self._lookup(fields)
+            # Stored arrays match element-wise, so documents with unhashable values are always rechecked
+            candidates = list(lookup.get(tuple(query[f] for f in fields), {}).values())
+            candidates.extend(lookup.get(None, {}).values())
+        else:
+            candidates = list(self._docs.values())
+        return (doc for doc in candidates if matches(doc, query))
+
+    def _check_unique(self, doc: dict, ignore_id=_MISSING):
+        for fields in self._unique:
+            key = self._lookup_key(fields, doc)
+            if key is None or _MISSING in key:
+                continue
+            for other_id in self._lookup(fields).get(key, {}):
+                if other_id != ignore_id:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _insert(self, doc: dict) -> Any:
+        doc.setdefault('_id', ObjectId())
+        if doc['_id'] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        stored = _copy(doc)
+        self._check_unique(stored)
+        self._docs[stored['_id']] = stored
+        self._index(stored)
+        return stored['_id']
+
+    def _update(self, query: dict, update: dict, upsert: bool, many: bool) -> UpdateResult:
+        result = UpdateResult()
+        for doc in list(self._find(query)):
+            result.matched_count += 1
+            before = _copy(doc)
+            changed = _apply_update(doc, update, inserting=False)
+            self._unindex(before, changed)
+            self._index(doc, changed)
+            result.modified_count += doc != before
+            if not many:
+                break
+        if not result.matched_count and upsert:
+            doc = _upsert_seed(query)
+            _apply_update(doc, update, inserting=True)
+            result.upserted_id = self._insert(doc)
+        return result
+
+    def _delete(self, query: dict, many: bool) -> int:
+        deleted = 0
+        for doc in list(self._find(query)):
+            self._unindex(doc)
+            del self._docs[doc['_id']]
+            deleted += 1
+            if not many:
+                break
+        return deleted
+
+    # Motor-compatible surface
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        for doc in self._find(filter):
+            return project(doc, projection)
+        return None
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        return InsertOneResult(self._insert(document))
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True) -> InsertManyResult:
+        if ordered:
+            return InsertManyResult([self._insert(doc) for doc in documents])
+        # Unordered inserts keep going past duplicates and report them together, as Motor does
+        inserted, errors = [], []
+        for index, doc in enumerate(documents):
+            try:
+                inserted.append(self._insert(doc))
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return InsertManyResult(inserted)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        return self._update(filter, update, upsert, many=False)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        return self._update(filter, update, upsert, many=True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False) -> UpdateResult:
+        for doc in self._find(filter):
+            self._unindex(doc)
+            del self._docs[doc['_id']]
+            self._insert({**replacement, '_id': doc['_id']})
+            return UpdateResult(matched_count=1, modified_count=1)
+        if upsert:
+            seed = _upsert_seed(filter)
+            return UpdateResult(upserted_id=self._insert({**seed, **replacement}))
+        return UpdateResult()
+
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        return DeleteResult(self._delete(filter, many=False))
+
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        return DeleteResult(self._delete(filter, many=True))
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        for doc in self._find(filter):
+            found = project(doc, projection)
+            self._unindex(doc)
+            del self._docs[doc['_id']]
+            return found
+        return None
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        result = BulkWriteResult()
+        for i, request in enumerate(requests):
+            doc = getattr(request, '_doc', None)
+            if isinstance(request, InsertOne):
+                self._insert(doc)
+                result.inserted_count += 1
+            elif isinstance(request, (UpdateOne, UpdateMany)):
+                update = self._update(request._filter, doc, request._upsert, many=isinstance(request, UpdateMany))
+                result.matched_count += update.matched_count
+                result.modified_count += update.modified_count
+                if update.upserted_id is not None:
+                    result.upserted_count += 1
+                    result.upserted_ids[i] = update.upserted_id
+            elif isinstance(request, ReplaceOne):
+                await self.replace_one(request._filter, doc, request._upsert)
+                result.matched_count += 1
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                result.deleted_count += self._delete(request._filter, many=isinstance(request, DeleteMany))
+            else:
+                raise NotImplementedError(f"Bulk operation {type(request).__name__}")
+        return result
+
+    async def count_documents(self, filter: dict) -> int:
+        return sum(1 for _ in self._find(filter))
+
+    async def estimated_document_count(self) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None) -> list:
+        values = []
+        for doc in self._find(filter):
+            value = _get(doc, key)
+            if value is not _MISSING and value not in values:
+                values.append(value)
+        return values
+
+    def aggregate(self, pipeline: List[dict]) -> AggregateCursor:
+        docs: Iterable[dict] = self._docs.values()
+        if pipeline and '$match' in pipeline[0]:
+            docs = self._find(pipeline[0]['$match'])
+            pipeline = pipeline[1:]
+        return AggregateCursor(run_pipeline(docs, pipeline))
+
+    async def create_indexes(self, indexes: List[Any]) -> List[str]:
+        names = []
+        for index in indexes:
+            document = index.document
+            if document.get('unique'):
+                fields = tuple(sorted(document['key']))
+                if fields not in self._unique:
+                    self._unique.append(fields)
+            names.append(document['name'])
+        return names
+
+    async def drop_index(self, name: str):
+        pass
+
+    async def drop(self):
+        self._docs.clear()
+        self._lookups.clear()
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == 'ping':
+            return {'ok': 1.0}
+        raise NotImplementedError(f"Command {name}")
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(name)
+        return database
+
+    @property
+    def admin(self) -> MemoryDatabase:
+        return self['admin']
+
+    def close(self):
+        pass
@@ -0,0 +1,476 @@
+"""Offline benchmarks for the analysis, ingestion and read paths.
+
+Runs without network or MongoDB: the app's database is swapped for the
+in-memory stand-in in memory_db.py and routes are called in-process through
+the ASGI interface. Run from backend/:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --suite endpoints --rows 1000,100000
+    python -m benchmarks.run --suite serialization
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json --tolerance 0.25
+
+Each scenario reports throughput, p50/p99 latency and peak memory. JSON read
+routes are measured twice: on the fast serialization path and, labelled
+"validated", through response_model validation (FAST_JSON_ENABLED=false). Latency is
+measured on an untraced pass; peak memory comes from a second pass under
+tracemalloc, so it covers this process only (not process-pool workers).
+The 1M-row endpoint tables need roughly 3.5 GB of RAM.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# server.py reads its configuration at import time; none of it may reach the network
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+import server  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from analysis import analyze_batch, analyze_sentiment  # noqa: E402
+from benchmarks.memory_db import MemoryClient  # noqa: E402
+from keywords import DocumentFrequencyIndex, candidate_terms  # noqa: E402
+from rollups import LABELS, apply_keywords, apply_rollup, apply_trends, init_rollup  # noqa: E402
+import serialization  # noqa: E402
+from storage import decode_result, encode_result  # noqa: E402
+
+SUITES = ('analysis', 'csv', 'endpoints', 'serialization')
+DEFAULT_ROWS = '1000,100000,1000000'
+DEFAULT_CSV_ROWS = '1000,10000,100000'
+SEED_CHUNK = 10000
+SAMPLE_CSV = Path(__file__).parent.parent.parent / 'sample_data.csv'
+
+VOCABULARY = [
+    'battery', 'screen', 'delivery', 'shipping', 'quality', 'price', 'support', 'service', 'packaging',
+    'design', 'camera', 'sound', 'comfort', 'size', 'color', 'refund', 'warranty', 'setup', 'manual',
+    'performance', 'speed', 'charger', 'cable', 'display', 'keyboard', 'software', 'update', 'value',
+    'material', 'finish', 'weight', 'experience', 'product', 'order', 'return', 'replacement',
+]
+
+
+def load_samples() -> List[str]:
+    with open(SAMPLE_CSV, newline='', encoding='utf-8') as f:
+        return [row['text'] for row in csv.DictReader(f) if row.get('text')]
+
+
+# ============ MEASUREMENT ============
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], units: int, elapsed: float, unit: str, peak_bytes: Optional[int]) -> dict:
+    return {
+        'unit': unit,
+        'throughput': round(units / elapsed, 2) if elapsed else 0.0,
+        'samples': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'peak_memory_mb': None if peak_bytes is None else round(peak_bytes / 1024 / 1024, 2),
+    }
+
+
+async def measure(run: Callable[[], Awaitable[List[float]]], units: int, unit: str, memory: bool) -> dict:
+    """Time one pass of `run` (which returns per-sample latencies), then repeat it traced for peak memory."""
+    started = time.perf_counter()
+    latencies = await run()
+    elapsed = time.perf_counter() - started
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            await run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return summarize(latencies, units, elapsed, unit, peak)
+
+
+def report(results: Dict[str, dict], name: str, result: dict):
+    results[name] = result
+    memory = '' if result['peak_memory_mb'] is None else f"  peak {result['peak_memory_mb']:>9.2f} MB"
+    print(
+        f"{name:<42} {result['throughput']:>12,.1f} {result['unit']:<8} "
+        f"p50 {result['p50_ms']:>10.3f} ms  p99 {result['p99_ms']:>10.3f} ms{memory}",
+        flush=True
+    )
+
+
+# ============ ANALYSIS ============
+
+async def bench_analysis(results: Dict[str, dict], args):
+    samples = load_samples()
+    short = [f"{samples[i % len(samples)]} #{i}" for i in range(args.analysis_texts)]
+    long_text = " ".join(samples * 20)
+    long = [f"{long_text} #{i}" for i in range(max(1, args.analysis_texts // 20))]
+
+    for label, texts in (('short', short), ('long', long)):
+        async def run_textblob(texts=texts) -> List[float]:
+            latencies = []
+            for text in texts:
+                started = time.perf_counter()
+                analyze_sentiment(text)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+        report(results, f"analyze_sentiment[{label}]", await measure(run_textblob, len(texts), 'texts/s', args.memory))
+
+        async def run_lexicon(texts=texts) -> List[float]:
+            latencies = []
+            for start in range(0, len(texts), 64):
+                started = time.perf_counter()
+                analyze_batch(texts[start:start + 64], 'lexicon')
+                latencies.append(time.perf_counter() - started)
+            return latencies
+        report(results, f"analyze_batch[lexicon,{label},64]", await measure(run_lexicon, len(texts), 'texts/s', args.memory))
+
+    # The keyword stage on its own: term extraction plus TF-IDF ranking against a growing index
+    words = [text.lower().split() for text in short]
+
+    async def run_keywords() -> List[float]:
+        index = DocumentFrequencyIndex()
+        latencies = []
+        for start in range(0, len(words), 500):
+            started = time.perf_counter()
+            batch = [candidate_terms(w) for w in words[start:start + 500]]
+            index.update(batch)
+            index.rank(batch)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+    report(results, "keywords[tfidf,500]", await measure(run_keywords, len(words), 'texts/s', args.memory))
+
+
+# ============ CSV INGESTION ============
+
+class BatchTimer:
+    """Stands in for a Job so ingest_upload reports when each batch is stored."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.rows_processed = 0
+        self._last = time.perf_counter()
+
+    def advance(self, rows: int):
+        now = time.perf_counter()
+        self.latencies.append(now - self._last)
+        self._last = now
+        self.rows_processed += rows
+
+
+def build_csv(rows: int, samples: List[str]) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['text'])
+    for i in range(rows):
+        # The suffix keeps every row distinct so the result cache does not short-circuit analysis
+        writer.writerow([f"{samples[i % len(samples)]} #{i}"])
+    return out.getvalue().encode('utf-8')
+
+
+def build_jsonl(rows: int, samples: List[str]) -> bytes:
+    lines = [json.dumps({'review': {'body': f"{samples[i % len(samples)]} #{i}"}}) for i in range(rows)]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+async def bench_csv(results: Dict[str, dict], args):
+    samples = load_samples()
+    for rows in args.csv_rows:
+        plain = build_csv(rows, samples)
+        # Compressed and JSON Lines uploads go through the same pipeline behind a streaming decoder
+        uploads = [
+            ('ingest_csv', 'bench.csv', plain, None),
+            ('ingest_csv.gz', 'bench.csv.gz', gzip.compress(plain), None),
+            ('ingest_jsonl', 'bench.jsonl', build_jsonl(rows, samples), 'review.body'),
+        ]
+        for name, filename, payload, json_path in uploads:
+            async def run(filename=filename, payload=payload, json_path=json_path) -> List[float]:
+                use_database(MemoryClient())
+                server.analysis_executor.cache.clear()
+                user_id = await create_user()
+                timer = BatchTimer()
+                await server.ingest_upload(
+                    io.BytesIO(payload), user_id, args.engine, job=timer, filename=filename, json_path=json_path
+                )
+                return timer.latencies
+            report(results, f"{name}[{rows}]", await measure(run, rows, 'rows/s', args.memory))
+
+
+# ============ ENDPOINTS ============
+
+def use_database(client: MemoryClient):
+    server.client = client
+    server.db = client[os.environ['DB_NAME']]
+    server.user_cache.clear()
+
+
+async def create_user() -> str:
+    user_id = str(uuid.uuid4())
+    await server.db.users.insert_one({
+        "id": user_id,
+        "email": f"{user_id}@bench.local",
+        "password": "",
+        "name": "Bench",
+        "is_admin": False,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    await init_rollup(server.db, user_id)
+    return user_id
+
+
+def synthetic_docs(rng: random.Random, user_id: str, count: int, now: datetime) -> List[dict]:
+    docs = []
+    for _ in range(count):
+        sentiment = rng.choice(LABELS)
+        polarity = {'positive': rng.uniform(0.1, 1), 'negative': rng.uniform(-1, -0.1)}.get(sentiment, 0.0)
+        created = now - timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        docs.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "user_id": user_id,
+            "text": " ".join(rng.choices(VOCABULARY, k=12)),
+            "sentiment": sentiment,
+            "polarity": round(polarity, 3),
+            "subjectivity": round(rng.random(), 3),
+            "keywords": rng.sample(VOCABULARY, 5),
+            "created_at": created.isoformat(timespec='milliseconds')
+        })
+    return docs
+
+
+async def seed(rows: int) -> str:
+    """Insert `rows` results for one user and maintain the views exactly as the write path does."""
+    rng = random.Random(rows)
+    user_id = await create_user()
+    now = datetime.now(timezone.utc)
+    for start in range(0, rows, SEED_CHUNK):
+        docs = synthetic_docs(rng, user_id, min(SEED_CHUNK, rows - start), now)
+        await server.db.sentiments.insert_many([encode_result(doc) for doc in docs])
+        await apply_rollup(server.db, user_id, docs)
+        await apply_trends(server.db, user_id, docs)
+        await apply_keywords(server.db, user_id, docs)
+    return user_id
+
+
+async def asgi_get(app, url: str, headers: Dict[str, str]) -> int:
+    """GET through the ASGI interface, discarding the body as it streams; returns the body size."""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': parts.path, 'raw_path': parts.path.encode(), 'query_string': parts.query.encode(), 'root_path': '',
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()],
+        'client': ('127.0.0.1', 0), 'server': ('bench', 80),
+    }
+    disconnected = asyncio.Event()
+    response = {'status': 0, 'size': 0}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['size'] += len(message.get('body', b''))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    if response['status'] >= 400:
+        raise RuntimeError(f"GET {url} returned {response['status']}")
+    return response['size']
+
+
+async def bench_endpoints(results: Dict[str, dict], args):
+    for rows in args.rows:
+        use_database(MemoryClient())
+        started = time.perf_counter()
+        user_id = await seed(rows)
+        print(f"seeded {rows:,} rows in {time.perf_counter() - started:.1f}s", flush=True)
+        user = await server.db.users.find_one({"id": user_id})
+        headers = {'Authorization': f"Bearer {server.create_token(user_id, user)}"}
+
+        # Streaming every row is linear in the table, so large tables get fewer repeats
+        export_repeat = max(3, min(args.repeat, 1_000_000 // rows))
+        page = min(rows, 500)
+        routes = [
+            ('stats', '/api/sentiments/stats', args.repeat, 1, False),
+            ('trends', '/api/sentiments/trends?days=30', args.repeat, 1, True),
+            ('keywords', '/api/sentiments/keywords?limit=20', args.repeat, 1, True),
+            ('sentiments', f'/api/sentiments?limit={page}', args.repeat, page, True),
+            ('export', '/api/export/csv', export_repeat, rows, False),
+        ]
+        for name, path, repeat, units_per_call, json_route in routes:
+            async def run(path=path, repeat=repeat) -> List[float]:
+                latencies = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    await asgi_get(server.app, path, headers)
+                    latencies.append(time.perf_counter() - started)
+                return latencies
+            unit = 'rows/s' if units_per_call > 1 else 'req/s'
+            report(results, f"GET {name}[{rows}]", await measure(run, repeat * units_per_call, unit, args.memory))
+            if json_route:
+                # The same route through response_model validation, to show what the fast path saves
+                fast, serialization.FAST_JSON_ENABLED = serialization.FAST_JSON_ENABLED, False
+                try:
+                    measured = await measure(run, repeat * units_per_call, unit, args.memory)
+                finally:
+                    serialization.FAST_JSON_ENABLED = fast
+                report(results, f"GET {name}[{rows}] validated", measured)
+
+
+# ============ SERIALIZATION ============
+
+def route_for(path: str):
+    return next(route for route in server.app.routes if getattr(route, 'path', None) == path)
+
+
+async def validated_body(route, content) -> bytes:
+    # What FastAPI does with a plain return value: response_model validation, then the route's response class
+    content = await serialize_response(field=route.response_field, response_content=content)
+    response_class = getattr(route.response_class, 'value', route.response_class)  # unwrap the app default
+    return response_class(content).body
+
+
+async def bench_serialization(results: Dict[str, dict], args):
+    """Encoding cost alone for each JSON read route, fast path against response_model validation."""
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    user_id = str(uuid.uuid4())
+    payloads = [
+        ('sentiments', '/api/sentiments', [decode_result(encode_result(doc)) for doc in synthetic_docs(rng, user_id, 500, now)]),
+        ('trends', '/api/sentiments/trends', [
+            {'date': (now - timedelta(days=i)).strftime('%Y-%m-%d'), **{label: rng.randrange(1000) for label in LABELS}}
+            for i in range(30)
+        ]),
+        ('keywords', '/api/sentiments/keywords', [
+            {'word': word, 'count': rng.randrange(1000)} for word in VOCABULARY
+        ]),
+        ('admin users', '/api/admin/users', [
+            {'id': str(uuid.uuid4()), 'email': f"user{i}@bench.local", 'name': f"User {i}", 'is_admin': False,
+             'created_at': now.isoformat()}
+            for i in range(200)
+        ]),
+    ]
+    encoder = serialization.serializer_stats()['encoder']
+    for name, path, content in payloads:
+        route = route_for(path)
+
+        async def run_fast(content=content) -> List[float]:
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                serialization.FastJSONResponse(content).body
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        async def run_validated(route=route, content=content) -> List[float]:
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await validated_body(route, content)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        report(results, f"serialize {name}[{len(content)},{encoder}]", await measure(run_fast, args.repeat, 'req/s', args.memory))
+        report(results, f"serialize {name}[{len(content)},validated]", await measure(run_validated, args.repeat, 'req/s', args.memory))
+
+
+# ============ BASELINES ============
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float) -> int:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        slower = result['p50_ms'] > before['p50_ms'] * (1 + tolerance)
+        lower = result['throughput'] < before['throughput'] * (1 - tolerance)
+        if slower or lower:
+            regressions += 1
+            print(
+                f"REGRESSION {name}: p50 {before['p50_ms']} -> {result['p50_ms']} ms, "
+                f"throughput {before['throughput']} -> {result['throughput']} {result['unit']}"
+            )
+    print(f"{regressions} regressions against {baseline_path} (tolerance {tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(',') if size]
+
+
+async def main(args) -> int:
+    results: Dict[str, dict] = {}
+    try:
+        if 'analysis' in args.suite:
+            await bench_analysis(results, args)
+        if 'csv' in args.suite:
+            await bench_csv(results, args)
+        if 'endpoints' in args.suite:
+            await bench_endpoints(results, args)
+        if 'serialization' in args.suite:
+            await bench_serialization(results, args)
+    finally:
+        server.analysis_executor.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'python': sys.version.split()[0],
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'executor': server.analysis_executor.stats()['executor'],
+                    'engine': args.engine or server.analysis_executor.stats()['engine'],
+                },
+                'results': results
+            }, f, indent=2)
+        print(f"Saved {len(results)} results to {args.output}")
+    if args.compare:
+        return compare(results, args.compare, args.tolerance)
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument('--suite', type=lambda v: v.split(','), default=list(SUITES),
+                        help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument('--rows', type=_sizes, default=_sizes(DEFAULT_ROWS), help="table sizes for the endpoint suite")
+    parser.add_argument('--csv-rows', type=_sizes, default=_sizes(DEFAULT_CSV_ROWS), help="file sizes for the CSV suite")
+    parser.add_argument('--analysis-texts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50, help="requests per endpoint per table size")
+    parser.add_argument('--engine', choices=['textblob', 'lexicon'], default=None)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the traced pass")
+    parser.add_argument('--output', help="write results as a JSON baseline")
+    parser.add_argument('--compare', help="baseline JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,109 @@
+import hashlib
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def text_key(text: str) -> bytes:
+    """Content address of a text: whitespace and Unicode form do not change the analysis."""
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+
+def approximate_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(v) for v in value)
+    return size
+
+
+class LRUCache:
+    """Bounded LRU map with optional TTL and byte budget. Not thread-safe; use from the event loop."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = 0,
+        ttl: float = 0,
+        sizeof: Callable[[Any], int] = approximate_size
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, size, expires = entry
+        if expires and expires < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        # Keys count toward the budget too: for small values such as counters they dominate
+        size = self.sizeof(key) + self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        expires = time.monotonic() + self.ttl if self.ttl else 0
+        self._data[key] = (value, size, expires)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        if key in self._data:
+            self._remove(key)
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
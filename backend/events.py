@@ -0,0 +1,179 @@
+"""Per-user push channel for results, rollup deltas and job progress.
+
+Clients subscribe with Server-Sent Events (`GET /api/events?token=...`, since
+EventSource cannot set headers) or a WebSocket (`/api/events/ws?token=...`).
+Writers publish to the hub, which encodes each event once and hands it to
+every open connection of that user. Events carry:
+
+- `results`: newly stored results (at most EVENTS_MAX_RESULTS per event, with the full count)
+- `stats`: the change to the user's rollup counts and polarity sum
+- `trends`: the change to each affected day and hour bucket
+- `deleted`: the id of a deleted result
+- `job`: a bulk job's status and progress
+
+An idle connection costs one queue and one parked coroutine; a single hub task
+sends the keep-alive to all of them. A client that falls EVENTS_QUEUE_SIZE
+events behind gets `resync` and is disconnected, and should refetch before
+reconnecting. The hub is per worker process: with several workers a client
+only sees writes (and jobs) handled by the worker holding its connection.
+"""
+import asyncio
+import os
+from typing import Dict, Optional, Set, Tuple
+
+from metrics import Counter, Gauge, registry
+from serialization import dumps
+
+# Event hub configuration
+EVENTS_ENABLED = os.environ.get('EVENTS_ENABLED', 'true').lower() == 'true'
+EVENTS_MAX_CONNECTIONS = int(os.environ.get('EVENTS_MAX_CONNECTIONS', '10000'))
+EVENTS_MAX_PER_USER = int(os.environ.get('EVENTS_MAX_PER_USER', '5'))
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', '100'))
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+EVENTS_MAX_RESULTS = int(os.environ.get('EVENTS_MAX_RESULTS', '50'))
+
+events_connections = registry.register(Gauge(
+    'events_connections', 'Open push connections on this worker.', ('transport',)
+))
+events_published = registry.register(Counter(
+    'events_published_total', 'Events published to users with open push connections.', ('event',)
+))
+events_dropped = registry.register(Counter(
+    'events_dropped_total', 'Push connections closed because the client fell behind.'
+))
+
+# (event name, encoded data); None tells a connection to close
+Message = Optional[Tuple[str, bytes]]
+
+PING: Message = ('ping', b'{}')
+RESYNC: Message = ('resync', b'{}')
+
+
+class TooManyConnections(Exception):
+    pass
+
+
+class Subscription:
+    __slots__ = ('user_id', 'transport', 'queue')
+
+    def __init__(self, user_id: str, transport: str):
+        self.user_id = user_id
+        self.transport = transport
+        # Bounded by the hub, which drops the client instead of blocking the writer
+        self.queue: 'asyncio.Queue[Message]' = asyncio.Queue()
+
+    async def __aiter__(self):
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                return
+            yield message
+
+
+class EventHub:
+    def __init__(
+        self,
+        max_connections: int = EVENTS_MAX_CONNECTIONS,
+        max_per_user: int = EVENTS_MAX_PER_USER,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+        heartbeat: float = EVENTS_HEARTBEAT_SECONDS
+    ):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str, transport: str) -> Subscription:
+        if self._connections >= self.max_connections:
+            raise TooManyConnections("Too many open event streams")
+        subscribers = self._subscribers.setdefault(user_id, set())
+        if len(subscribers) >= self.max_per_user:
+            raise TooManyConnections("Too many open event streams for this user")
+        if self._heartbeat_task is None and self.heartbeat > 0:
+            self._heartbeat_task = asyncio.create_task(self._send_heartbeats())
+        subscription = Subscription(user_id, transport)
+        subscribers.add(subscription)
+        self._connections += 1
+        events_connections.inc(transport)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self._connections -= 1
+        events_connections.dec(subscription.transport)
+
+    def listening(self, user_id: str) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: str, event: str, data):
+        """Fan an event out to the user's open connections; a no-op (no encoding) when there are none."""
+        subscribers = self._subscribers.get(user_id)
+        if not subscribers:
+            return
+        message = (event, dumps(data))
+        for subscription in list(subscribers):
+            self._deliver(subscription, message)
+        self.published += 1
+        events_published.inc(event)
+
+    def _deliver(self, subscription: Subscription, message: Message):
+        if subscription.queue.qsize() < self.queue_size:
+            subscription.queue.put_nowait(message)
+            return
+        # The writer never waits on a slow client: it is told to resync and disconnected
+        subscription.queue.put_nowait(RESYNC)
+        subscription.queue.put_nowait(None)
+        self.unsubscribe(subscription)
+        self.dropped += 1
+        events_dropped.inc()
+
+    async def _send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for subscribers in list(self._subscribers.values()):
+                for subscription in list(subscribers):
+                    self._deliver(subscription, PING)
+
+    async def close(self):
+        """Disconnect every client (on shutdown) and stop the keep-alive task."""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.queue.put_nowait(None)
+                self.unsubscribe(subscription)
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+    def stats(self) -> dict:
+        return {
+            'enabled': EVENTS_ENABLED,
+            'connections': self._connections,
+            'users': len(self._subscribers),
+            'max_connections': self.max_connections,
+            'published': self.published,
+            'dropped': self.dropped
+        }
+
+
+def format_sse(message: Tuple[str, bytes]) -> bytes:
+    event, data = message
+    if event == 'ping':
+        # A comment line: keeps proxies from timing out without waking the client's handlers
+        return b': ping\n\n'
+    return b'event: ' + event.encode() + b'\ndata: ' + data + b'\n\n'
+
+
+def format_ws(message: Tuple[str, bytes]) -> str:
+    event, data = message
+    return '{"event":"' + event + '","data":' + data.decode('utf-8') + '}'
@@ -0,0 +1,69 @@
+import csv
+import io
+import os
+import zlib
+from typing import AsyncIterator
+
+from serialization import dumps
+from storage import decode_result
+
+# Export configuration
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_FLUSH_BYTES = int(os.environ.get('EXPORT_FLUSH_BYTES', str(64 * 1024)))
+
+EXPORT_FIELDS = ['text', 'sentiment', 'polarity', 'subjectivity', 'keywords', 'created_at']
+# text_z holds long texts of compact results
+EXPORT_PROJECTION = {"_id": 0, "text_z": 1, **{field: 1 for field in EXPORT_FIELDS}}
+
+MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+async def iter_csv(cursor) -> AsyncIterator[str]:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for doc in cursor:
+        s = decode_result(doc)
+        writer.writerow({
+            'text': s['text'],
+            'sentiment': s['sentiment'],
+            'polarity': s['polarity'],
+            'subjectivity': s['subjectivity'],
+            'keywords': ', '.join(s.get('keywords', [])),
+            'created_at': s['created_at']
+        })
+        if output.tell() >= EXPORT_FLUSH_BYTES:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+async def iter_ndjson(cursor) -> AsyncIterator[str]:
+    lines = []
+    size = 0
+    async for doc in cursor:
+        s = decode_result(doc)
+        line = dumps({field: s.get(field) for field in EXPORT_FIELDS}).decode('utf-8') + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_FLUSH_BYTES:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+async def iter_gzip(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(cursor, fmt: str = 'csv', compress: bool = False) -> AsyncIterator:
+    chunks = iter_ndjson(cursor) if fmt == 'ndjson' else iter_csv(cursor)
+    return iter_gzip(chunks) if compress else chunks
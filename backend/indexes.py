@@ -0,0 +1,201 @@
+"""Index manifest and query-plan checks.
+
+The manifest is applied on startup. The diagnostics run `explain` on the query
+shape behind each route and flag any plan that falls back to a collection scan:
+
+    python indexes.py ensure
+    python indexes.py explain
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+from rollups import stats_pipeline
+from storage import id_to_key
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    'users': [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("is_admin", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    ],
+    'sentiments': [
+        # Only legacy results carry `id`; compact ones would each add a null entry
+        IndexModel([("id", ASCENDING)], name="id_legacy", partialFilterExpression={"id": {"$exists": True}}),
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("sentiment", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("sentiment", ASCENDING), ("polarity", ASCENDING)]),
+    ],
+    'sentiment_trends': [
+        IndexModel([("user_id", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)], unique=True),
+    ],
+    'keyword_counts': [
+        IndexModel([("user_id", ASCENDING), ("word", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("count", DESCENDING), ("word", ASCENDING)]),
+    ],
+    'keyword_df': [
+        IndexModel([("scope", ASCENDING), ("term", ASCENDING)], unique=True),
+    ],
+}
+
+# Indexes replaced by an entry above, dropped once the replacement exists
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    'sentiments': ['id_1'],
+}
+
+SAMPLE_USER = "00000000-0000-0000-0000-000000000000"
+SAMPLE_ID = id_to_key(SAMPLE_USER)
+SAMPLE_TIME = datetime(2024, 1, 1)
+
+# (route, collection, explain command body) for the query shape each route runs
+QUERY_SHAPES = [
+    ("POST /api/auth/login", "users", {"find": "users", "filter": {"email": "someone@example.com"}}),
+    ("get_current_user", "users", {"find": "users", "filter": {"id": SAMPLE_USER}}),
+    ("GET /api/admin/users", "users", {
+        "find": "users", "filter": {}, "sort": {"created_at": -1, "id": -1}, "limit": 50
+    }),
+    ("GET /api/admin/users?is_admin=", "users", {
+        "find": "users", "filter": {"is_admin": True}, "sort": {"created_at": -1, "id": -1}, "limit": 50
+    }),
+    ("GET /api/admin/users?q=", "users", {
+        "find": "users", "filter": {"email": {"$regex": "^someone"}}, "sort": {"email": 1}, "limit": 50
+    }),
+    ("GET /api/sentiments", "sentiments", {
+        "find": "sentiments", "filter": {"user_id": SAMPLE_USER},
+        "sort": {"created_at": -1, "_id": -1}, "limit": 100
+    }),
+    ("GET /api/sentiments?sentiment=", "sentiments", {
+        "find": "sentiments", "filter": {"user_id": SAMPLE_USER, "sentiment": {"$in": ["positive", 1]}},
+        "sort": {"created_at": -1, "_id": -1}, "limit": 100
+    }),
+    ("GET /api/sentiments?cursor=", "sentiments", {
+        "find": "sentiments",
+        "filter": {
+            "user_id": SAMPLE_USER,
+            "$or": [
+                {"created_at": {"$lte": SAMPLE_TIME}, "$or": [
+                    {"created_at": {"$lt": SAMPLE_TIME}}, {"created_at": SAMPLE_TIME, "_id": {"$lt": SAMPLE_ID}}
+                ]},
+                {"created_at": {"$type": "string"}}
+            ]
+        },
+        "sort": {"created_at": -1, "_id": -1}, "limit": 100
+    }),
+    ("rollup rebuild", "sentiments", {
+        "aggregate": "sentiments", "cursor": {}, "pipeline": stats_pipeline({"user_id": SAMPLE_USER})
+    }),
+    ("GET /api/admin/stats", "sentiments", {
+        "find": "sentiments", "filter": {}, "sort": {"created_at": -1}, "limit": 10
+    }),
+    ("DELETE /api/sentiments/{id}", "sentiments", {"find": "sentiments", "filter": {
+        "$or": [{"_id": SAMPLE_ID}, {"id": SAMPLE_USER}], "user_id": SAMPLE_USER
+    }}),
+    ("GET /api/export/csv", "sentiments", {"find": "sentiments", "filter": {"user_id": SAMPLE_USER}}),
+    ("GET /api/sentiments/trends", "sentiment_trends", {
+        "find": "sentiment_trends", "filter": {"user_id": SAMPLE_USER, "granularity": "day"},
+        "sort": {"bucket": -1}, "limit": 30
+    }),
+    ("GET /api/sentiments/keywords", "keyword_counts", {
+        "find": "keyword_counts", "filter": {"user_id": SAMPLE_USER},
+        "sort": {"count": -1, "word": 1}, "limit": 50
+    }),
+    ("keyword document frequencies", "keyword_df", {"find": "keyword_df", "filter": {
+        "scope": SAMPLE_USER, "term": {"$in": ["service", "delivery"]}
+    }}),
+]
+
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes on {collection}: {str(e)}")
+            continue
+        for name in SUPERSEDED_INDEXES.get(collection, []):
+            try:
+                await db[collection].drop_index(name)
+            except OperationFailure:
+                pass  # already dropped
+            except PyMongoError as e:
+                logger.error(f"Could not drop index {name} on {collection}: {str(e)}")
+
+
+def _plan_stages(plan) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def _winning_plans(explain) -> list:
+    plans = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'winningPlan':
+                plans.append(value)
+            else:
+                plans.extend(_winning_plans(value))
+    elif isinstance(explain, list):
+        for value in explain:
+            plans.extend(_winning_plans(value))
+    return plans
+
+
+async def explain_queries(db) -> List[dict]:
+    report = []
+    for route, collection, command in QUERY_SHAPES:
+        entry = {"route": route, "collection": collection}
+        try:
+            explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            stages = _plan_stages(_winning_plans(explain))
+            entry["stages"] = stages
+            entry["collection_scan"] = "COLLSCAN" in stages
+        except PyMongoError as e:
+            entry["error"] = str(e)
+        report.append(entry)
+    return report
+
+
+async def _main(args):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if args.command == 'ensure':
+            await ensure_indexes(db)
+            print("Indexes applied")
+        else:
+            report = await explain_queries(db)
+            print(json.dumps(report, indent=2))
+            if any(entry.get("collection_scan") for entry in report):
+                raise SystemExit(1)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply the index manifest or check query plans")
+    parser.add_argument('command', choices=['ensure', 'explain'])
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,255 @@
+"""Streaming text extraction from uploaded files.
+
+Uploads are CSV or JSON Lines, either plain, gzip-compressed (`.csv.gz`,
+`.jsonl.gz`) or as members of a `.zip` archive (which may hold several files,
+themselves optionally gzipped). Everything is decompressed and decoded chunk
+by chunk, so memory stays bounded by one batch of texts however large the
+expanded upload is. CSV_MAX_ROWS applies to the upload as a whole.
+
+The text is read from `text_column` (a CSV column or a top-level JSON key) or,
+for JSON Lines, from `json_path` (dotted keys and list indexes, e.g.
+`review.body` or `messages.0.text`), which takes precedence. Without either, the first of TEXT_COLUMNS present is used;
+a JSON line that is a bare string is taken as the text.
+
+Callers store texts batch by batch while the upload is still being read, so
+an error raised partway through (bad encoding, invalid JSON, a corrupt or
+mismatched archive member) can follow batches that were already saved; the
+caller records that count on the error as `stored`.
+"""
+import codecs
+import csv
+import gzip
+import itertools
+import json
+import os
+import zipfile
+import zlib
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+# Ingestion configuration
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', str(64 * 1024)))
+CSV_BATCH_SIZE = int(os.environ.get('CSV_BATCH_SIZE', '500'))
+CSV_MAX_ROWS = int(os.environ.get('CSV_MAX_ROWS', '1000000'))
+# Longest line accepted; guards against a compressed upload that expands into one endless line
+INGEST_MAX_LINE_BYTES = int(os.environ.get('INGEST_MAX_LINE_BYTES', str(1024 * 1024)))
+
+# A quoted CSV field may span lines, but is held to the same limit as a line
+csv.field_size_limit(max(INGEST_MAX_LINE_BYTES, 131072))
+
+TEXT_COLUMNS = ['text', 'Text', 'content', 'Content', 'tweet', 'Tweet', 'review', 'Review', 'message', 'Message']
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+SUPPORTED_UPLOADS = "a .csv, .jsonl or .ndjson file, optionally gzipped (.gz), or a .zip of them"
+
+
+class IngestionError(ValueError):
+    # Texts already stored when the error was hit partway through an upload
+    stored = 0
+
+
+def iter_decoded_lines(
+    fileobj: BinaryIO,
+    chunk_size: int = CSV_CHUNK_SIZE,
+    max_line: int = INGEST_MAX_LINE_BYTES
+) -> Iterator[str]:
+    """Decode a binary upload chunk by chunk and yield it line by line, newlines included."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        if len(pending) > max_line:
+            raise IngestionError(f"Line longer than {max_line} bytes")
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def detect_text_column(fieldnames: Optional[List[str]], text_column: Optional[str] = None) -> Optional[str]:
+    if not fieldnames:
+        return None
+    if text_column:
+        if text_column not in fieldnames:
+            raise IngestionError(f"Column '{text_column}' not found")
+        return text_column
+    for field in TEXT_COLUMNS:
+        if field in fieldnames:
+            return field
+    # Use first column
+    return fieldnames[0]
+
+
+def iter_csv_texts(fileobj: BinaryIO, max_rows: int = CSV_MAX_ROWS, text_column: Optional[str] = None) -> Iterator[str]:
+    """Yield the non-empty texts of a CSV upload without holding the file in memory."""
+    csv_reader = csv.DictReader(iter_decoded_lines(fileobj))
+    try:
+        fieldnames = csv_reader.fieldnames
+    except csv.Error as e:
+        raise IngestionError(f"Invalid CSV header: {e}")
+    text_column = detect_text_column(fieldnames, text_column)
+    if not text_column:
+        raise IngestionError("Could not find text column in CSV")
+
+    count = 0
+    rows = iter(csv_reader)
+    for number in itertools.count(1):
+        if count >= max_rows:
+            break
+        try:
+            row = next(rows, None)
+        except csv.Error as e:
+            # line_num counts physical lines, header included; quoted fields may span several
+            raise IngestionError(f"Invalid CSV at row {number} (line {csv_reader.line_num}): {e}")
+        if row is None:
+            break
+        text = (row.get(text_column) or '').strip()
+        if not text:
+            continue
+        yield text
+        count += 1
+
+
+def parse_json_path(json_path: str) -> List[Any]:
+    parts = []
+    for part in json_path.split('.'):
+        if not part:
+            raise IngestionError(f"Invalid JSON path: {json_path}")
+        parts.append(int(part) if part.isdigit() else part)
+    return parts
+
+
+def extract_text(value: Any, path: Optional[List[Any]]) -> Optional[str]:
+    if path is None:
+        if isinstance(value, dict):
+            field = next((f for f in TEXT_COLUMNS if f in value), None)
+            value = value.get(field) if field else None
+        return value if isinstance(value, str) else None
+    for part in path:
+        if isinstance(part, int) and isinstance(value, list):
+            value = value[part] if part < len(value) else None
+        elif isinstance(value, dict):
+            value = value.get(str(part))
+        else:
+            return None
+    return value if isinstance(value, str) else None
+
+
+def iter_jsonl_texts(
+    fileobj: BinaryIO,
+    max_rows: int = CSV_MAX_ROWS,
+    json_path: Optional[str] = None,
+    text_column: Optional[str] = None
+) -> Iterator[str]:
+    """Yield the non-empty texts of a JSON Lines upload; lines without a text are skipped."""
+    path = parse_json_path(json_path) if json_path else ([text_column] if text_column else None)
+    count = 0
+    for number, line in enumerate(iter_decoded_lines(fileobj), 1):
+        if count >= max_rows:
+            break
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            raise IngestionError(f"Invalid JSON on line {number}")
+        text = (extract_text(value, path) or '').strip()
+        if not text:
+            continue
+        yield text
+        count += 1
+
+
+def detect_format(filename: str) -> Tuple[bool, Optional[str]]:
+    """(gzipped, format) for a file name; the format is 'zip' for archives and None when unsupported."""
+    name = (filename or '').lower()
+    gzipped = name.endswith('.gz')
+    if gzipped:
+        name = name[:-len('.gz')]
+    if name.endswith('.zip') and not gzipped:
+        return False, 'zip'
+    return gzipped, FORMATS.get(os.path.splitext(name)[1])
+
+
+def check_upload(filename: str):
+    if detect_format(filename)[1] is None:
+        raise IngestionError(f"File must be {SUPPORTED_UPLOADS}")
+
+
+def iter_members(archive: zipfile.ZipFile) -> Iterator[Tuple[str, BinaryIO, bool, str]]:
+    found = False
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+            continue
+        gzipped, fmt = detect_format(name)
+        if fmt is None or fmt == 'zip':
+            continue
+        if info.flag_bits & 0x1:
+            raise IngestionError(f"{name} is encrypted")
+        found = True
+        # Members are inflated as they are read
+        with archive.open(info) as member:
+            yield name, member, gzipped, fmt
+    if not found:
+        raise IngestionError(f"Archive holds no {', '.join(FORMATS)} files")
+
+
+def iter_upload_texts(
+    fileobj: BinaryIO,
+    filename: str,
+    text_column: Optional[str] = None,
+    json_path: Optional[str] = None,
+    max_rows: int = CSV_MAX_ROWS
+) -> Iterator[str]:
+    """Yield the texts of an upload in any supported format; zip archives need a seekable file."""
+    gzipped, fmt = detect_format(filename)
+    if fmt is None:
+        raise IngestionError(f"File must be {SUPPORTED_UPLOADS}")
+    try:
+        if fmt == 'zip':
+            with zipfile.ZipFile(fileobj) as archive:
+                remaining = max_rows
+                for name, member, member_gzipped, member_fmt in iter_members(archive):
+                    try:
+                        for text in _iter_source(member, member_gzipped, member_fmt, text_column, json_path, remaining):
+                            remaining -= 1
+                            yield text
+                    except IngestionError as e:
+                        raise IngestionError(f"{name}: {e}")
+                    if remaining <= 0:
+                        break
+        else:
+            yield from _iter_source(fileobj, gzipped, fmt, text_column, json_path, max_rows)
+    except (zipfile.BadZipFile, gzip.BadGzipFile, EOFError, zlib.error) as e:
+        raise IngestionError(f"Could not decompress upload: {e}")
+
+
+def _iter_source(
+    fileobj: BinaryIO,
+    gzipped: bool,
+    fmt: str,
+    text_column: Optional[str],
+    json_path: Optional[str],
+    max_rows: int
+) -> Iterator[str]:
+    if gzipped:
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if fmt == 'jsonl':
+        return iter_jsonl_texts(fileobj, max_rows, json_path, text_column)
+    return iter_csv_texts(fileobj, max_rows, text_column)
+
+
+def iter_batches(items: Iterable, size: int = CSV_BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
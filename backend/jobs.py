@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration
+JOB_MAX_CONCURRENCY = int(os.environ.get('JOB_MAX_CONCURRENCY', '4'))
+JOB_MAX_PER_USER = int(os.environ.get('JOB_MAX_PER_USER', '1'))
+# Unfinished (queued or running) jobs a user may have; each may hold a spooled upload
+JOB_MAX_QUEUED_PER_USER = int(os.environ.get('JOB_MAX_QUEUED_PER_USER', '5'))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', '3600'))
+JOB_MAX_ERRORS_KEPT = 10
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+
+class JobNotFound(KeyError):
+    pass
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, user_id: str, kind: str):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.kind = kind
+        self.status = 'queued'
+        self.rows_processed = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listener: Optional[Callable[['Job'], None]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def advance(self, rows: int):
+        self.rows_processed += rows
+        self._notify()
+
+    def record_error(self, message: str):
+        self.error_count += 1
+        self.errors = (self.errors + [message])[-JOB_MAX_ERRORS_KEPT:]
+
+    def _mark_started(self):
+        self.status = 'running'
+        self._started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._notify()
+
+    def _mark_finished(self, status: str):
+        self.status = status
+        self._finished = time.monotonic()
+        self.finished_at = datetime.now(timezone.utc).isoformat()
+        self._notify()
+
+    def _notify(self):
+        if self._listener is None:
+            return
+        try:
+            self._listener(self)
+        except Exception as e:
+            logger.error(f"Job listener failed for {self.id}: {str(e)}")
+
+    def to_dict(self) -> dict:
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'rows_per_second': round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0.0,
+            'elapsed_seconds': round(elapsed, 3),
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobScheduler:
+    """Runs bulk jobs as asyncio tasks with a global and a per-user concurrency cap."""
+
+    def __init__(
+        self,
+        max_concurrency: int = JOB_MAX_CONCURRENCY,
+        max_per_user: int = JOB_MAX_PER_USER,
+        max_queued_per_user: int = JOB_MAX_QUEUED_PER_USER,
+        listener: Optional[Callable[[Job], None]] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queued_per_user = max_queued_per_user
+        # Called with the job whenever it starts, makes progress or finishes
+        self.listener = listener
+        self._jobs: Dict[str, Job] = {}
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._user_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def check_capacity(self, user_id: str):
+        """Raise TooManyJobs when the user already has max_queued_per_user unfinished jobs."""
+        unfinished = sum(1 for job in self._jobs.values() if job.user_id == user_id and not job.finished)
+        if unfinished >= self.max_queued_per_user:
+            raise TooManyJobs(f"At most {self.max_queued_per_user} unfinished jobs per user")
+
+    def submit(
+        self,
+        user_id: str,
+        kind: str,
+        fn: Callable[[Job], Awaitable[None]],
+        cleanup: Optional[Callable[[], None]] = None
+    ) -> Job:
+        """Queue a job; `cleanup` runs once the job ends however it ends, even if cancelled before starting."""
+        self._prune()
+        self.check_capacity(user_id)
+        if self._global_slots is None:
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        job = Job(user_id, kind)
+        job._listener = self.listener
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job, fn))
+        job._task.add_done_callback(lambda _: self._finish(job, cleanup))
+        return job
+
+    def _finish(self, job: Job, cleanup: Optional[Callable[[], None]]):
+        # A task cancelled before its first step never runs _run at all
+        if not job.finished:
+            job._mark_finished('cancelled')
+        # Drop the task so a retained job does not keep the closure (and whatever it holds) alive
+        job._task = None
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                logger.error(f"Job cleanup failed for {job.id}: {str(e)}")
+
+    async def _run(self, job: Job, fn: Callable[[Job], Awaitable[None]]):
+        user_slots = self._user_slots.setdefault(job.user_id, asyncio.Semaphore(self.max_per_user))
+        try:
+            # Take the user's slot first so queued jobs of one tenant never hold global slots
+            async with user_slots, self._global_slots:
+                job._mark_started()
+                await fn(job)
+            job._mark_finished('completed')
+        except asyncio.CancelledError:
+            job._mark_finished('cancelled')
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            job.record_error(str(e))
+            job._mark_finished('failed')
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            raise JobNotFound(job_id)
+        return job
+
+    def list_for_user(self, user_id: str) -> List[Job]:
+        return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    def cancel(self, job_id: str, user_id: Optional[str] = None) -> Job:
+        job = self.get(job_id, user_id)
+        if not job.finished and job._task is not None:
+            job._task.cancel()
+        return job
+
+    def stats(self) -> dict:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_per_user': self.max_per_user,
+            'max_queued_per_user': self.max_queued_per_user,
+            'jobs': statuses
+        }
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+        for job_id in [job.id for job in self._jobs.values() if job.finished and job._finished < cutoff]:
+            del self._jobs[job_id]
+        active_users = {job.user_id for job in self._jobs.values() if not job.finished}
+        for user_id in [user_id for user_id in self._user_slots if user_id not in active_users]:
+            del self._user_slots[user_id]
+
+    async def shutdown(self):
+        tasks = [job._task for job in self._jobs.values() if job._task is not None and not job._task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
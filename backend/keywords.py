@@ -0,0 +1,160 @@
+"""Keyword extraction.
+
+The analysis workers reduce each text to candidate term counts. The web process
+then ranks those terms by TF-IDF against a document-frequency index that is
+updated incrementally as results are stored. The index is kept per user (or
+globally) in the `keyword_df` collection. Ranking a batch reads only the
+frequencies of that batch's terms; they are cached per term in memory, within
+an entry and byte budget, for KEYWORD_DF_TTL seconds.
+"""
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from cache import LRUCache
+
+# Keyword configuration
+KEYWORD_EXTRACTOR = os.environ.get('KEYWORD_EXTRACTOR', 'tfidf')
+KEYWORD_DF_SCOPE = os.environ.get('KEYWORD_DF_SCOPE', 'user')
+KEYWORD_DF_CACHE_SCOPES = int(os.environ.get('KEYWORD_DF_CACHE_SCOPES', '1000'))
+KEYWORD_DF_CACHE_TERMS = int(os.environ.get('KEYWORD_DF_CACHE_TERMS', '200000'))
+KEYWORD_DF_CACHE_MAX_BYTES = int(os.environ.get('KEYWORD_DF_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+KEYWORD_DF_TTL = float(os.environ.get('KEYWORD_DF_TTL', '300'))
+KEYWORDS_PER_TEXT = 5
+
+GLOBAL_SCOPE = '*'
+
+STOP_WORDS = frozenset({'the', 'is', 'at', 'which', 'on', 'a', 'an', 'as', 'are', 'was', 'were', 'been', 'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'them', 'their', 'what', 'which', 'who', 'when', 'where', 'why', 'how', 'and', 'or', 'but', 'not', 'no', 'yes', 'to', 'from', 'in', 'out', 'up', 'down', 'with', 'by', 'for', 'of'})
+
+
+def candidate_terms(words: Iterable[str]) -> Dict[str, int]:
+    # Filter out common stop words and get meaningful words
+    return dict(Counter(word for word in words if len(word) > 3 and word not in STOP_WORDS))
+
+
+def frequency_keywords(terms: Dict[str, int], k: int = KEYWORDS_PER_TEXT) -> List[str]:
+    return [word for word, count in Counter(terms).most_common(k)]
+
+
+class DocumentFrequencyIndex:
+    """Document frequencies (of at least the terms being ranked) for one scope, ranked with smoothed TF-IDF."""
+
+    def __init__(self, df: Optional[Dict[str, int]] = None, n_docs: int = 0):
+        self.df: Dict[str, int] = df or {}
+        self.n_docs = n_docs
+
+    def update(self, batch: List[Dict[str, int]]):
+        for terms in batch:
+            for term in terms:
+                self.df[term] = self.df.get(term, 0) + 1
+        self.n_docs += len(batch)
+
+    def rank(self, batch: List[Dict[str, int]], k: int = KEYWORDS_PER_TEXT) -> List[List[str]]:
+        # The batch is laid out as a CSR matrix (indptr/indices/data) over its own vocabulary
+        vocab: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for terms in batch:
+            for term, tf in terms.items():
+                indices.append(vocab.setdefault(term, len(vocab)))
+                data.append(tf)
+            indptr.append(len(indices))
+        if not indices:
+            return [[] for _ in batch]
+
+        terms_by_id = list(vocab)
+        df = np.fromiter((self.df.get(term, 0) for term in terms_by_id), dtype=np.float64, count=len(terms_by_id))
+        idf = np.log((1 + self.n_docs) / (1 + df)) + 1.0
+        scores = np.asarray(data, dtype=np.float64) * idf[np.asarray(indices)]
+
+        ranked = []
+        for start, end in zip(indptr, indptr[1:]):
+            # Stable sort keeps first-occurrence order on ties, like Counter.most_common
+            order = np.argsort(-scores[start:end], kind='stable')[:k]
+            ranked.append([terms_by_id[indices[start + i]] for i in order])
+        return ranked
+
+
+class KeywordExtractor:
+    def __init__(self, mode: str = KEYWORD_EXTRACTOR, scope: str = KEYWORD_DF_SCOPE):
+        self.mode = mode
+        self.scope = scope
+        # scope -> document count, and (scope, term) -> document frequency
+        self._n_docs = LRUCache(KEYWORD_DF_CACHE_SCOPES, ttl=KEYWORD_DF_TTL)
+        self._df = LRUCache(KEYWORD_DF_CACHE_TERMS, max_bytes=KEYWORD_DF_CACHE_MAX_BYTES, ttl=KEYWORD_DF_TTL)
+
+    def scope_for(self, user_id: str) -> str:
+        return GLOBAL_SCOPE if self.scope == 'global' else user_id
+
+    async def load_index(self, db, scope: str, terms: Iterable[str]) -> DocumentFrequencyIndex:
+        """The scope's document count and the frequencies of `terms`, reading only cache misses."""
+        n_docs = self._n_docs.get(scope)
+        if n_docs is None:
+            totals = await db.keyword_df_scopes.find_one({"_id": scope})
+            n_docs = totals['n_docs'] if totals else 0
+            self._n_docs.set(scope, n_docs)
+        df: Dict[str, int] = {}
+        missing = []
+        for term in terms:
+            cached = self._df.get((scope, term))
+            if cached is None:
+                missing.append(term)
+            else:
+                df[term] = cached
+        if missing:
+            found = dict.fromkeys(missing, 0)
+            cursor = db.keyword_df.find({"scope": scope, "term": {"$in": missing}}, {"_id": 0, "term": 1, "df": 1})
+            async for doc in cursor:
+                found[doc['term']] = doc['df']
+            for term, count in found.items():
+                self._df.set((scope, term), count)
+            df.update(found)
+        return DocumentFrequencyIndex(df, n_docs)
+
+    async def extract(self, db, user_id: str, batch: List[Dict[str, int]], update: bool = True) -> List[List[str]]:
+        if self.mode != 'tfidf':
+            return [frequency_keywords(terms) for terms in batch]
+        scope = self.scope_for(user_id)
+        index = await self.load_index(db, scope, {term for terms in batch for term in terms})
+        if update:
+            await self._count(db, scope, index, batch)
+        return index.rank(batch)
+
+    async def record(self, db, scope: str, batch: List[Dict[str, int]]):
+        """Count texts that were ranked with update=False, e.g. once per write-behind flush."""
+        if self.mode != 'tfidf' or not batch:
+            return
+        index = await self.load_index(db, scope, {term for terms in batch for term in terms})
+        await self._count(db, scope, index, batch)
+
+    async def _count(self, db, scope: str, index: DocumentFrequencyIndex, batch: List[Dict[str, int]]):
+        index.update(batch)
+        self._remember(scope, index, batch)
+        await self._persist(db, scope, batch)
+
+    def _remember(self, scope: str, index: DocumentFrequencyIndex, batch: List[Dict[str, int]]):
+        self._n_docs.set(scope, index.n_docs)
+        for term in {term for terms in batch for term in terms}:
+            self._df.set((scope, term), index.df[term])
+
+    async def _persist(self, db, scope: str, batch: List[Dict[str, int]]):
+        increments = Counter(term for terms in batch for term in terms)
+        if increments:
+            await db.keyword_df.bulk_write([
+                UpdateOne({"scope": scope, "term": term}, {"$inc": {"df": n}}, upsert=True)
+                for term, n in increments.items()
+            ], ordered=False)
+        await db.keyword_df_scopes.update_one({"_id": scope}, {"$inc": {"n_docs": len(batch)}}, upsert=True)
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'scope': self.scope,
+            'cached_scopes': self._n_docs.stats(),
+            'cached_terms': self._df.stats()
+        }
+
@@ -0,0 +1,184 @@
+"""Precompiled pattern-lexicon sentiment engine.
+
+Scores text with the same lexicon, intensifier, negation, exclamation and
+emoticon rules as TextBlob's PatternAnalyzer, but the lexicon is compiled once
+into flat lookup tables and a whole batch is reduced with NumPy instead of
+building assessment objects per word.
+
+Check parity with TextBlob and compare throughput:
+
+    python lexicon_engine.py parity [file.csv ...]
+
+tests/test_lexicon_parity.py runs the same check under pytest on the samples,
+sample_data.csv and seeded random lexicon sentences.
+"""
+import argparse
+import csv
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from textblob import TextBlob
+from textblob._text import EMOTICONS, PUNCTUATION
+from textblob.en import sentiment as pattern_sentiment
+
+PARITY_TOLERANCE = 1e-6
+
+PARITY_SAMPLES = [
+    "This is amazing! I love it so much!",
+    "Terrible experience. Very disappointed.",
+    "It's okay, nothing special.",
+    "not good", "not bad", "not very good at all", "really not good",
+    "very very happy :) <3", "I'm so happy :-D", "Great, just great (!)",
+    "The movie was terribly boring and incredibly long!!!",
+    "No, never again. Worst service ever.",
+    "",
+]
+
+
+class CompiledLexicon:
+    def __init__(self, sentiment=pattern_sentiment):
+        # Touching the lazy dict loads en-sentiment.xml and the derived -ly adverbs
+        len(sentiment)
+        self.tokenizer = sentiment.tokenizer
+        self.negations = frozenset(sentiment.negations)
+        modifiers = tuple(sentiment.modifiers)
+        # word -> (polarity, subjectivity, intensity, is_modifier), using the POS-averaged scores
+        self.entries: Dict[str, Tuple[float, float, float, bool]] = {}
+        for word, senses in dict.items(sentiment):
+            p, s, i = senses[None]
+            self.entries[word] = (p, s, i, any(m in senses for m in modifiers))
+        self.emoticons: Dict[str, float] = {}
+        for (_, p), faces in EMOTICONS.items():
+            for face in faces:
+                self.emoticons.setdefault(face.lower(), p)
+
+    def tokens(self, text: str) -> List[str]:
+        return [w.lower() for w in " ".join(self.tokenizer(text)).split()]
+
+    def assess(self, tokens: Sequence[str]) -> List[list]:
+        """[polarity, subjectivity, intensity, negated] per assessed chunk, as PatternAnalyzer builds them."""
+        entries, negations, emoticons = self.entries, self.negations, self.emoticons
+        a: List[list] = []
+        m: Optional[str] = None
+        n: Optional[str] = None
+        for w in tokens:
+            entry = entries.get(w)
+            if entry is not None:
+                p, s, i, is_modifier = entry
+                if m is None:
+                    a.append([p, s, i, 1])
+                else:
+                    last = a[-1]
+                    last[0] = max(-1.0, min(p * last[2], 1.0))
+                    last[1] = max(-1.0, min(s * last[2], 1.0))
+                    last[2] = i
+                if n is not None:
+                    a[-1][2] = 1.0 / a[-1][2]
+                    a[-1][3] = -1
+                m = w if is_modifier else None
+                n = w if w in negations else None
+            else:
+                if w in negations:
+                    n = w
+                elif n and len(w.strip("'")) > 1:
+                    n = None
+                if n is not None and m is not None and m.endswith("ly"):
+                    a[-1][3] = -1
+                    n = None
+                elif m and len(w) > 2:
+                    m = None
+                if w == "!" and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, 1.0))
+                if w == "(!)":
+                    a.append([0.0, 1.0, 1.0, 1])
+                if not w.isalpha() and len(w) <= 5 and w not in PUNCTUATION:
+                    p = emoticons.get(w)
+                    if p is not None:
+                        a.append([p, 1.0, 1.0, 1])
+        return a
+
+    def score_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[List[str]]]:
+        """Polarity and subjectivity arrays for a batch, plus each text's tokens."""
+        tokens = [self.tokens(text) for text in texts]
+        owners: List[int] = []
+        rows: List[list] = []
+        for index, text_tokens in enumerate(tokens):
+            assessed = self.assess(text_tokens)
+            owners.extend([index] * len(assessed))
+            rows.extend(assessed)
+
+        size = len(texts)
+        if not rows:
+            return np.zeros(size), np.zeros(size), tokens
+        table = np.asarray(rows, dtype=np.float64)
+        owner = np.asarray(owners, dtype=np.int64)
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity = np.where(table[:, 3] < 0, table[:, 0] * -0.5, table[:, 0])
+        counts = np.maximum(np.bincount(owner, minlength=size), 1)
+        return (
+            np.bincount(owner, weights=polarity, minlength=size) / counts,
+            np.bincount(owner, weights=table[:, 1], minlength=size) / counts,
+            tokens
+        )
+
+
+_lexicon: Optional[CompiledLexicon] = None
+
+
+def get_lexicon() -> CompiledLexicon:
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = CompiledLexicon()
+    return _lexicon
+
+
+def words_from_tokens(tokens: Sequence[str]) -> List[str]:
+    words = (token.strip(string.punctuation) for token in tokens)
+    return [word for word in words if word]
+
+
+# ============ PARITY CHECK ============
+
+def _load_texts(paths: Sequence[str]) -> List[str]:
+    texts = list(PARITY_SAMPLES)
+    for path in paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            texts.extend(row[0] for row in reader if row)
+    return texts
+
+
+def parity(paths: Sequence[str]) -> int:
+    texts = _load_texts(paths)
+    lexicon = get_lexicon()
+
+    started = time.perf_counter()
+    expected = [TextBlob(text).sentiment for text in texts]
+    textblob_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    polarity, subjectivity, _ = lexicon.score_batch(texts)
+    engine_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for text, want, p, s in zip(texts, expected, polarity, subjectivity):
+        if abs(want.polarity - p) > PARITY_TOLERANCE or abs(want.subjectivity - s) > PARITY_TOLERANCE:
+            mismatches += 1
+            print(f"MISMATCH {text!r}: textblob=({want.polarity:.6f}, {want.subjectivity:.6f}) engine=({p:.6f}, {s:.6f})")
+
+    print(f"{len(texts)} texts, {mismatches} mismatches (tolerance {PARITY_TOLERANCE})")
+    print(f"textblob: {len(texts) / textblob_seconds:,.0f} texts/s, lexicon engine: {len(texts) / engine_seconds:,.0f} texts/s")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the lexicon engine against TextBlob")
+    parser.add_argument('command', choices=['parity'])
+    parser.add_argument('files', nargs='*', default=[str(Path(__file__).parent.parent / 'sample_data.csv')])
+    args = parser.parse_args()
+    sys.exit(parity(args.files))
@@ -0,0 +1,44 @@
+import base64
+from typing import List, Optional, Sequence
+
+from bson import json_util
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence) -> str:
+    # Extended JSON keeps BSON datetimes and binary ids typed across the round trip
+    raw = json_util.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, size: int) -> List:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json_util.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(fields: Sequence[str], values: Sequence, descending: bool = True) -> dict:
+    """Filter for the rows strictly after `values` in a sort on `fields` (all descending or all ascending)."""
+    after, bound = ("$lt", "$lte") if descending else ("$gt", "$gte")
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {f: v for f, v in zip(fields[:i], values[:i])}
+        clause[field] = {after: values[i]}
+        clauses.append(clause)
+    if len(clauses) == 1:
+        return clauses[0]
+    # The bound on the leading field keeps the index scan range tight
+    return {fields[0]: {bound: values[0]}, "$or": clauses}
+
+
+def next_cursor(page: List[dict], fields: Sequence[str], limit: int) -> Optional[str]:
+    if len(page) < limit or not page:
+        return None
+    last = page[-1]
+    return encode_cursor([last[field] for field in fields])
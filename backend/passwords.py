@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+from metrics import password_hash_duration
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS', '4'))
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', str(PASSWORD_HASH_THREADS)))
+
+# bcrypt releases the GIL, so a small dedicated pool keeps hashing off the event loop
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix='bcrypt')
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class HashTimings:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.waiting = 0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def stats(self) -> dict:
+        return {
+            'rounds': BCRYPT_ROUNDS,
+            'max_concurrency': PASSWORD_HASH_CONCURRENCY,
+            'waiting': self.waiting,
+            'count': self.count,
+            'avg_ms': round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 2)
+        }
+
+
+hash_timings = HashTimings()
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+async def _run(operation: str, fn, *args):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    hash_timings.waiting += 1
+    try:
+        await _slots.acquire()
+    finally:
+        hash_timings.waiting -= 1
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+    finally:
+        elapsed = time.perf_counter() - started
+        hash_timings.record(elapsed)
+        password_hash_duration.observe(elapsed, operation)
+        _slots.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run('hash', _hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run('verify', _verify, password, hashed)
+
+
+def shutdown_hash_pool():
+    _pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+"""Opt-in sampling profiler for individual requests.
+
+With PROFILING_ENABLED=true, a request sent with `X-Profile: 1` by an admin
+(bearer token) or an operator (`X-Profile-Token: $METRICS_TOKEN`) is sampled
+every PROFILE_INTERVAL_MS on the event-loop thread until its response
+finishes; the header is ignored on other requests. The collapsed stacks (flamegraph.pl / speedscope format) are kept in
+a small ring buffer and the response carries `X-Profile-Id` to fetch them.
+Other requests interleaved on the same loop show up in the samples too.
+"""
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Profiling configuration
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_KEPT = int(os.environ.get('PROFILE_MAX_KEPT', '20'))
+PROFILE_MAX_DEPTH = 64
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_TOKEN_HEADER = b'x-profile-token'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+class ProfileStore:
+    def __init__(self, max_kept: int):
+        self.max_kept = max_kept
+        self._profiles: 'OrderedDict[str, str]' = OrderedDict()
+
+    def add(self, profile_id: str, route: str, stacks: Counter):
+        lines = [f"# {route}"] + [f"{stack} {count}" for stack, count in stacks.most_common()]
+        self._profiles[profile_id] = '\n'.join(lines) + '\n'
+        while len(self._profiles) > self.max_kept:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[str]:
+        return self._profiles.get(profile_id)
+
+
+profiles = ProfileStore(PROFILE_MAX_KEPT)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, authorize: Callable[[Dict[bytes, bytes]], Awaitable[bool]]):
+        self.app = app
+        # Decides from the request headers whether the caller may profile
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILING_ENABLED or scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope['headers'])
+        if headers.get(PROFILE_HEADER) != b'1' or not await self.authorize(headers):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = Sampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        # The id is announced up front; the profile becomes readable once the response completes
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(PROFILE_ID_HEADER.lower().encode(), profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Joining the sampler can take up to one interval; keep that wait off the event loop
+            profiles.add(profile_id, f"{scope['method']} {scope['path']}", await run_in_threadpool(sampler.stop))
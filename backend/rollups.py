@@ -0,0 +1,366 @@
+"""Materialized per-user sentiment rollups.
+
+`user_stats` holds one document per user (keyed by user id) with label counts
+and the polarity sum. `sentiment_trends` holds per-user label counts in UTC
+day and hour buckets. `keyword_counts` holds per-user keyword frequencies.
+Writers keep all three current with atomic $inc updates; the repair command
+rebuilds them from the raw `sentiments` collection:
+
+    python rollups.py rebuild [--user USER_ID]
+
+Users whose rollup predates ROLLUP_VERSION get it rebuilt on their first read.
+A worker runs one rebuild per user at a time (concurrent reads wait for it),
+and rebuilds write with upserts, so rebuilds racing across workers converge
+instead of colliding on the unique indexes. A result written while its user's
+rebuild runs can still be miscounted; running the repair command during a
+deploy that bumps ROLLUP_VERSION keeps rebuilds off the read path entirely.
+"""
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+from storage import hour_expression, label_of
+
+# Bump when a new materialized view is added so existing rollups get rebuilt on read
+ROLLUP_VERSION = 3
+LABELS = ('positive', 'negative', 'neutral')
+
+# Keyword index configuration (KEYWORD_MAX_TERMS=0 keeps exact counts for every term)
+KEYWORD_MAX_TERMS = int(os.environ.get('KEYWORD_MAX_TERMS', '0'))
+KEYWORD_PRUNE_INTERVAL = int(os.environ.get('KEYWORD_PRUNE_INTERVAL', '100'))
+
+def empty_rollup() -> dict:
+    return {'total': 0, 'positive': 0, 'negative': 0, 'neutral': 0, 'polarity_sum': 0.0}
+
+
+def rollup_delta(docs: Iterable[dict], sign: int = 1) -> dict:
+    delta = empty_rollup()
+    for doc in docs:
+        delta['total'] += sign
+        delta[doc['sentiment']] += sign
+        delta['polarity_sum'] += sign * doc['polarity']
+    return delta
+
+
+async def init_rollup(db, user_id: str):
+    await db.user_stats.update_one(
+        {"_id": user_id},
+        {"$setOnInsert": {**empty_rollup(), "version": ROLLUP_VERSION}},
+        upsert=True
+    )
+
+
+async def apply_rollup(db, user_id: str, docs: Iterable[dict], sign: int = 1):
+    delta = {k: v for k, v in rollup_delta(docs, sign).items() if v}
+    if delta:
+        await db.user_stats.update_one({"_id": user_id}, {"$inc": delta}, upsert=True)
+
+
+def stats_pipeline(match: dict) -> list:
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "user_id": 1, "sentiment": 1, "polarity": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "sentiment": "$sentiment"},
+            "count": {"$sum": 1},
+            "polarity_sum": {"$sum": "$polarity"}
+        }}
+    ]
+
+
+def _merge_groups(groups: Iterable[dict]) -> dict:
+    rollups = {}
+    for g in groups:
+        rollup = rollups.setdefault(g['_id']['user_id'], empty_rollup())
+        rollup['total'] += g['count']
+        rollup[label_of(g['_id']['sentiment'])] += g['count']
+        rollup['polarity_sum'] += g['polarity_sum']
+    return rollups
+
+
+async def rebuild_user_rollup(db, user_id: str) -> dict:
+    groups = await db.sentiments.aggregate(stats_pipeline({"user_id": user_id})).to_list(None)
+    rollup = _merge_groups(groups).get(user_id, empty_rollup())
+    await rebuild_user_trends(db, user_id)
+    await rebuild_user_keywords(db, user_id)
+    await db.user_stats.replace_one({"_id": user_id}, {**rollup, "version": ROLLUP_VERSION}, upsert=True)
+    return rollup
+
+
+# user id -> [lock, holders]; an entry lives only while a rebuild for that user runs or waits
+_rebuild_locks: Dict[str, list] = {}
+
+
+@asynccontextmanager
+async def _rebuild_lock(user_id: str):
+    entry = _rebuild_locks.setdefault(user_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _rebuild_locks[user_id]
+
+
+def _current(rollup: Optional[dict]) -> bool:
+    return bool(rollup) and rollup.get('version', 0) >= ROLLUP_VERSION
+
+
+async def read_rollup(db, user_id: str) -> dict:
+    rollup = await db.user_stats.find_one({"_id": user_id})
+    if _current(rollup):
+        return rollup
+    # Users whose history predates the current views get them built on first read
+    async with _rebuild_lock(user_id):
+        rollup = await db.user_stats.find_one({"_id": user_id})
+        if _current(rollup):
+            return rollup
+        return await rebuild_user_rollup(db, user_id)
+
+
+async def mark_stale(db, user_id: str):
+    # The next read rebuilds the user's rollup, trends and keywords from the stored results
+    await db.user_stats.update_one({"_id": user_id}, {"$set": {"version": 0}})
+
+
+async def ensure_rollups(db, user_id: str):
+    if not _current(await db.user_stats.find_one({"_id": user_id}, {"version": 1})):
+        await read_rollup(db, user_id)
+
+# ============ TREND BUCKETS ============
+
+def _trend_buckets(docs: Iterable[dict], sign: int) -> Dict[Tuple[str, str], Dict[str, int]]:
+    buckets: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for doc in docs:
+        # created_at is a UTC ISO timestamp: YYYY-MM-DDTHH:...
+        for key in (('day', doc['created_at'][:10]), ('hour', doc['created_at'][:13])):
+            counts = buckets.setdefault(key, dict.fromkeys(LABELS, 0))
+            counts[doc['sentiment']] += sign
+    return buckets
+
+
+def trend_delta(docs: Iterable[dict], sign: int = 1) -> List[dict]:
+    return [
+        {"granularity": granularity, "bucket": bucket, **counts}
+        for (granularity, bucket), counts in _trend_buckets(docs, sign).items()
+    ]
+
+
+async def apply_trends(db, user_id: str, docs: Iterable[dict], sign: int = 1):
+    buckets = _trend_buckets(docs, sign)
+    if not buckets:
+        return
+    await db.sentiment_trends.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "granularity": granularity, "bucket": bucket},
+            {"$inc": {label: n for label, n in counts.items() if n}},
+            upsert=True
+        )
+        for (granularity, bucket), counts in buckets.items()
+    ], ordered=False)
+    if sign < 0:
+        # Upserts only set the labels they incremented, so a missing label counts as zero
+        await db.sentiment_trends.delete_many({
+            "user_id": user_id,
+            "bucket": {"$in": [bucket for _, bucket in buckets]},
+            "$nor": [{label: {"$gt": 0}} for label in LABELS]
+        })
+
+
+async def rebuild_user_trends(db, user_id: str):
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": {"hour": hour_expression(), "sentiment": "$sentiment"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    buckets: Dict[Tuple[str, str], Dict[str, int]] = {}
+    async for g in db.sentiments.aggregate(pipeline):
+        hour = g['_id']['hour']
+        for key in (('day', hour[:10]), ('hour', hour)):
+            counts = buckets.setdefault(key, dict.fromkeys(LABELS, 0))
+            counts[label_of(g['_id']['sentiment'])] += g['count']
+    # Upsert every bucket, then drop the ones that no longer have results
+    writes = [
+        UpdateOne(
+            {"user_id": user_id, "granularity": granularity, "bucket": bucket},
+            {"$set": counts},
+            upsert=True
+        )
+        for (granularity, bucket), counts in buckets.items()
+    ]
+    for granularity in ('day', 'hour'):
+        kept = [bucket for g, bucket in buckets if g == granularity]
+        writes.append(DeleteMany({"user_id": user_id, "granularity": granularity, "bucket": {"$nin": kept}}))
+    await db.sentiment_trends.bulk_write(writes)
+
+
+def _utc_bucket(day: date, tz: tzinfo, source: str) -> str:
+    start = datetime(day.year, day.month, day.day, tzinfo=tz).astimezone(timezone.utc)
+    return start.strftime('%Y-%m-%d' if source == 'day' else '%Y-%m-%dT%H')
+
+
+def _point_key(bucket: str, source: str, tz: tzinfo, granularity: str) -> str:
+    if source == 'day':
+        return bucket
+    local = datetime.strptime(bucket, '%Y-%m-%dT%H').replace(tzinfo=timezone.utc).astimezone(tz)
+    return local.strftime('%Y-%m-%d' if granularity == 'day' else '%Y-%m-%dT%H:00')
+
+
+async def read_trends(
+    db,
+    user_id: str,
+    days: int = 7,
+    tz: Optional[tzinfo] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = 'day'
+) -> List[dict]:
+    """Trend points for a user, oldest first.
+
+    Without a range this returns the points of the `days` most recent days that
+    have data (one point per day, or each hour with data in those days).
+    UTC daily trends read the day buckets directly; other time zones and hourly
+    trends are re-bucketed from the UTC hour buckets (offsets that are not whole
+    hours are attributed by the hour a bucket starts in).
+    """
+    await ensure_rollups(db, user_id)
+    source = 'day' if tz is None and granularity == 'day' else 'hour'
+    tz = tz or timezone.utc
+    query = {"user_id": user_id, "granularity": source}
+    bounded = start is not None or end is not None
+    if bounded:
+        query['bucket'] = {}
+        if start is not None:
+            query['bucket']['$gte'] = _utc_bucket(start, tz, source)
+        if end is not None:
+            query['bucket']['$lt'] = _utc_bucket(end + timedelta(days=1), tz, source)
+
+    projection = {"_id": 0, "bucket": 1, **{label: 1 for label in LABELS}}
+    cursor = db.sentiment_trends.find(query, projection).sort("bucket", -1)
+    if source == 'day' and not bounded:
+        cursor = cursor.limit(days)
+
+    points: Dict[str, dict] = {}
+    days_seen = set()
+    async for b in cursor:
+        key = _point_key(b['bucket'], source, tz, granularity)
+        if key not in points:
+            # Keys start with the local date (YYYY-MM-DD), so hourly points are limited by day as well
+            day = key[:10]
+            if not bounded and day not in days_seen:
+                if len(days_seen) >= days:
+                    break
+                days_seen.add(day)
+            points[key] = {'date': key, **dict.fromkeys(LABELS, 0)}
+        for label in LABELS:
+            points[key][label] += b.get(label, 0)
+    return sorted(points.values(), key=lambda p: p['date'])
+
+
+async def rebuild_all_rollups(db) -> int:
+    rebuilt = 0
+    async for user in db.users.find({}, {"_id": 0, "id": 1}):
+        await rebuild_user_rollup(db, user['id'])
+        rebuilt += 1
+    return rebuilt
+
+# ============ KEYWORD INDEX ============
+
+_keyword_writes: Dict[str, int] = {}
+
+
+async def apply_keywords(db, user_id: str, docs: Iterable[dict], sign: int = 1):
+    counts: Dict[str, int] = {}
+    for doc in docs:
+        for word in doc.get('keywords', []):
+            counts[word] = counts.get(word, 0) + sign
+    if not counts:
+        return
+    await db.keyword_counts.bulk_write([
+        UpdateOne({"user_id": user_id, "word": word}, {"$inc": {"count": n}}, upsert=True)
+        for word, n in counts.items()
+    ], ordered=False)
+    if sign < 0:
+        await db.keyword_counts.delete_many({"user_id": user_id, "word": {"$in": list(counts)}, "count": {"$lte": 0}})
+    elif KEYWORD_MAX_TERMS:
+        _keyword_writes[user_id] = _keyword_writes.get(user_id, 0) + 1
+        if _keyword_writes[user_id] >= KEYWORD_PRUNE_INTERVAL:
+            _keyword_writes.pop(user_id)
+            await prune_keywords(db, user_id, KEYWORD_MAX_TERMS)
+
+
+async def prune_keywords(db, user_id: str, max_terms: int):
+    """Drop the long tail so a tenant keeps at most about max_terms keywords.
+
+    Counts of surviving terms stay exact; terms that are pruned and reappear
+    restart from zero, so very rare terms are undercounted.
+    """
+    boundary = await db.keyword_counts.find(
+        {"user_id": user_id}, {"_id": 0, "count": 1, "word": 1}
+    ).sort([("count", -1), ("word", 1)]).skip(max_terms).limit(1).to_list(1)
+    if boundary:
+        # The first term past max_terms and everything after it in (count desc, word) order
+        count, word = boundary[0]['count'], boundary[0]['word']
+        await db.keyword_counts.delete_many({"user_id": user_id, "$or": [
+            {"count": {"$lt": count}},
+            {"count": count, "word": {"$gte": word}}
+        ]})
+
+
+async def rebuild_user_keywords(db, user_id: str):
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "keywords": 1}},
+        {"$unwind": "$keywords"},
+        {"$group": {"_id": "$keywords", "count": {"$sum": 1}}}
+    ]
+    groups = await db.sentiments.aggregate(pipeline).to_list(None)
+    writes = [
+        UpdateOne({"user_id": user_id, "word": g['_id']}, {"$set": {"count": g['count']}}, upsert=True)
+        for g in groups
+    ]
+    writes.append(DeleteMany({"user_id": user_id, "word": {"$nin": [g['_id'] for g in groups]}}))
+    await db.keyword_counts.bulk_write(writes)
+    if KEYWORD_MAX_TERMS:
+        await prune_keywords(db, user_id, KEYWORD_MAX_TERMS)
+
+
+async def read_top_keywords(db, user_id: str, limit: int) -> List[dict]:
+    await ensure_rollups(db, user_id)
+    cursor = db.keyword_counts.find(
+        {"user_id": user_id}, {"_id": 0, "word": 1, "count": 1}
+    ).sort([("count", -1), ("word", 1)]).limit(limit)
+    return await cursor.to_list(limit)
+
+
+async def _main(args):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if args.user:
+            print(await rebuild_user_rollup(db, args.user))
+        else:
+            print(f"Rebuilt rollups for {await rebuild_all_rollups(db)} users")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain materialized sentiment rollups")
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--user', help="Only rebuild this user id")
+    asyncio.run(_main(parser.parse_args()))
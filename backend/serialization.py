@@ -0,0 +1,53 @@
+"""JSON responses for documents the backend already trusts.
+
+By default FastAPI validates a route's return value against its
+response_model, runs it through jsonable_encoder and encodes it with
+json.dumps. Rows read back from our own collections already have the right
+shape, so read-heavy routes return `json_response(...)` instead: a Response
+object that FastAPI sends untouched, encoded with orjson when it is installed.
+The response_model still documents the schema in OpenAPI.
+
+FAST_JSON_ENABLED=false sends the same routes through validation again, which
+is useful when chasing a suspected shape mismatch.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+# Serialization configuration
+FAST_JSON_ENABLED = os.environ.get('FAST_JSON_ENABLED', 'true').lower() == 'true'
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, response: Response, headers: Optional[Dict[str, str]] = None):
+    """Encode `content` directly, or hand it back for validation when FAST_JSON_ENABLED is off.
+
+    Headers set on the injected `response` are not copied onto a returned
+    Response, so routes pass theirs here.
+    """
+    if not FAST_JSON_ENABLED:
+        response.headers.update(headers or {})
+        return content
+    return FastJSONResponse(content, headers=headers)
+
+
+def serializer_stats() -> dict:
+    return {'fast_json': FAST_JSON_ENABLED, 'encoder': 'orjson' if orjson is not None else 'json'}
@@ -1,29 +1,59 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import (
+    FastAPI, APIRouter, Depends, Header, HTTPException, status, UploadFile, File, Query, Request, Response, WebSocket,
+    WebSocketDisconnect
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone, timedelta
-import bcrypt
+from datetime import date, datetime, timezone, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import jwt
-from textblob import TextBlob
-import csv
-import io
+import json
 import re
-from collections import Counter
+import shutil
+import tempfile
+from analysis import ENGINES, create_executor, preload
+from cache import LRUCache
+from events import EVENTS_ENABLED, EVENTS_MAX_RESULTS, EventHub, TooManyConnections, format_sse, format_ws
+from export import EXPORT_BATCH_SIZE, EXPORT_PROJECTION, MEDIA_TYPES, export_stream
+from indexes import ensure_indexes, explain_queries
+from ingestion import CSV_BATCH_SIZE, IngestionError, check_upload, iter_batches, iter_upload_texts
+from jobs import Job, JobNotFound, JobScheduler, TooManyJobs
+from keywords import KeywordExtractor
+from metrics import METRICS_TOKEN, Counter, MetricsMiddleware, MongoCommandTimer, authorized, registry
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_filter, next_cursor
+from passwords import hash_password, hash_timings, shutdown_hash_pool, verify_password
+from profiling import PROFILE_ID_HEADER, PROFILE_TOKEN_HEADER, ProfilingMiddleware, profiles
+from rollups import (
+    apply_keywords, apply_rollup, apply_trends, init_rollup, mark_stale, read_rollup, read_top_keywords, read_trends,
+    rollup_delta, trend_delta
+)
+from serialization import json_response, serializer_stats
+from startup import PRELOAD_ANALYZER, ping_mongo, process_age, startup_report
+from storage import RESULT_PROJECTION, decode_result, encode_result, id_filter, label_values
+from writebehind import WRITE_BEHIND_ENABLED, BufferFull, WriteBehindBuffer
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    event_listeners=[MongoCommandTimer()]
+)
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -31,6 +61,18 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production'
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Largest number of texts accepted by /api/analyze/batch
+BATCH_MAX_TEXTS = int(os.environ.get('BATCH_MAX_TEXTS', '1000'))
+# Embed the user's profile in tokens so read-only routes can skip the user lookup
+TRUST_TOKEN_CLAIMS = os.environ.get('TRUST_TOKEN_CLAIMS', 'false').lower() == 'true'
+
+# Admin dashboard snapshot refresh interval (seconds)
+ADMIN_STATS_REFRESH = float(os.environ.get('ADMIN_STATS_REFRESH', '30'))
+
+# Authenticated user cache
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '30'))
+
 # Create the main app without a prefix
 app = FastAPI(title="Sentiment Analysis API", version="1.0")
 
@@ -89,20 +131,31 @@ class TrendPoint(BaseModel):
     negative: int
     neutral: int
 
-# ============ AUTH UTILITIES ============
+class BatchItem(BaseModel):
+    text: str
+    client_id: Optional[str] = None
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+class BatchResult(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    client_id: Optional[str] = None
+    id: Optional[str] = None
+    text: str
+    sentiment: str
+    polarity: float
+    subjectivity: float
+    keywords: List[str]
+    created_at: Optional[str] = None
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+# ============ AUTH UTILITIES ============
 
-def create_token(user_id: str) -> str:
+def create_token(user_id: str, user: Optional[dict] = None) -> str:
     expiration = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     payload = {
         'user_id': user_id,
         'exp': expiration
     }
+    if TRUST_TOKEN_CLAIMS and user:
+        payload['user'] = {field: user.get(field) for field in TOKEN_USER_CLAIMS}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def decode_token(token: str) -> dict:
@@ -113,43 +166,54 @@ def decode_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+TOKEN_USER_CLAIMS = ('email', 'name', 'is_admin', 'created_at')
+
+# Short-lived cache of user documents so authenticated requests skip a Mongo read.
+# No route updates or deletes users, so TTL expiry is the only invalidation: a user
+# changed directly in Mongo is seen by the API within USER_CACHE_TTL seconds.
+user_cache = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+async def load_user(user_id: str) -> dict:
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user_cache.set(user_id, user)
+    return user
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     token = credentials.credentials
     payload = decode_token(token)
-    user = await db.users.find_one({"id": payload['user_id']}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    return await load_user(payload['user_id'])
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    # Read-only routes may trust the signed profile in the token instead of loading the user
+    payload = decode_token(credentials.credentials)
+    if TRUST_TOKEN_CLAIMS and isinstance(payload.get('user'), dict):
+        return {'id': payload['user_id'], **payload['user']}
+    return await load_user(payload['user_id'])
 
 # ============ SENTIMENT ANALYSIS UTILITIES ============
 
-def analyze_sentiment(text: str) -> dict:
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    subjectivity = blob.sentiment.subjectivity
-    
-    # Determine sentiment
-    if polarity > 0.1:
-        sentiment = "positive"
-    elif polarity < -0.1:
-        sentiment = "negative"
-    else:
-        sentiment = "neutral"
-    
-    # Extract keywords (simple approach: get nouns and adjectives)
-    words = blob.words.lower()
-    # Filter out common stop words and get meaningful words
-    stop_words = {'the', 'is', 'at', 'which', 'on', 'a', 'an', 'as', 'are', 'was', 'were', 'been', 'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'them', 'their', 'what', 'which', 'who', 'when', 'where', 'why', 'how', 'and', 'or', 'but', 'not', 'no', 'yes', 'to', 'from', 'in', 'out', 'up', 'down', 'with', 'by', 'for', 'of'}
-    keywords = [word for word in words if len(word) > 3 and word not in stop_words]
-    keyword_freq = Counter(keywords)
-    top_keywords = [word for word, count in keyword_freq.most_common(5)]
-    
-    return {
-        'sentiment': sentiment,
-        'polarity': round(polarity, 3),
-        'subjectivity': round(subjectivity, 3),
-        'keywords': top_keywords
-    }
+# Scoring is CPU-bound, so it runs on a pluggable executor (a process pool by default)
+analysis_executor = create_executor()
+if PRELOAD_ANALYZER:
+    with startup_report.phase('preload'):
+        preload()
+ENGINE_PATTERN = f"^({'|'.join(ENGINES)})$"
+
+# Keywords are re-ranked against the corpus document frequencies (KEYWORD_EXTRACTOR=frequency disables it)
+keyword_extractor = KeywordExtractor()
+
+# Per-user push channel for dashboards (see events.py)
+event_hub = EventHub()
+
+def publish_job(job: Job):
+    event_hub.publish(job.user_id, 'job', job.to_dict())
+
+# Bulk jobs run in-process, capped globally and per user
+job_scheduler = JobScheduler(listener=publish_job)
 
 # ============ AUTH ROUTES ============
 
@@ -167,15 +231,16 @@ async def register(user_data: UserCreate):
         user_doc = {
             "id": user_id,
             "email": email_str,
-            "password": hash_password(user_data.password),
+            "password": await hash_password(user_data.password),
             "name": user_data.name,
             "is_admin": False,
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
         await db.users.insert_one(user_doc)
+        await init_rollup(db, user_id)
         
-        token = create_token(user_id)
+        token = create_token(user_id, user_doc)
         user = User(
             id=user_id,
             email=email_str,
@@ -195,10 +260,10 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     email_str = str(credentials.email).lower()
     user = await db.users.find_one({"email": email_str})
-    if not user or not verify_password(credentials.password, user['password']):
+    if not user or not await verify_password(credentials.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_token(user['id'])
+    token = create_token(user['id'], user)
     user_obj = User(
         id=user['id'],
         email=user['email'],
@@ -210,220 +275,551 @@ async def login(credentials: UserLogin):
     return TokenResponse(token=token, user=user_obj)
 
 @api_router.get("/auth/me", response_model=User)
-async def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(current_user: dict = Depends(get_token_user)):
     return User(**current_user)
 
 # ============ SENTIMENT ANALYSIS ROUTES ============
 
-@api_router.post("/analyze/text", response_model=SentimentResult)
-async def analyze_text(input_data: TextInput, current_user: dict = Depends(get_current_user)):
-    if not input_data.text.strip():
-        raise HTTPException(status_code=400, detail="Text cannot be empty")
-    
-    analysis = analyze_sentiment(input_data.text)
-    
-    result_id = str(uuid.uuid4())
-    result_doc = {
-        "id": result_id,
-        "user_id": current_user['id'],
-        "text": input_data.text,
+def build_result_doc(user_id: str, text: str, analysis: dict) -> dict:
+    # Millisecond precision, as stored in a BSON datetime
+    created_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "text": text,
         "sentiment": analysis['sentiment'],
         "polarity": analysis['polarity'],
         "subjectivity": analysis['subjectivity'],
         "keywords": analysis['keywords'],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": created_at
     }
-    
-    await db.sentiments.insert_one(result_doc)
-    
-    return SentimentResult(**result_doc)
 
-@api_router.post("/analyze/csv")
-async def analyze_csv(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="File must be a CSV")
-    
-    contents = await file.read()
-    decoded = contents.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(decoded))
-    
-    # Try to find text column
-    fieldnames = csv_reader.fieldnames
-    text_column = None
-    for field in ['text', 'Text', 'content', 'Content', 'tweet', 'Tweet', 'review', 'Review', 'message', 'Message']:
-        if field in fieldnames:
-            text_column = field
-            break
+async def rank_keywords(user_id: str, analyses: List[dict], update: bool = True) -> List[dict]:
+    ranked = await keyword_extractor.extract(db, user_id, [analysis.pop('terms') for analysis in analyses], update)
+    for analysis, keywords in zip(analyses, ranked):
+        analysis['keywords'] = keywords
+    return analyses
+
+async def apply_views(user_id: str, results: List[dict]):
+    await apply_rollup(db, user_id, results)
+    await apply_trends(db, user_id, results)
+    await apply_keywords(db, user_id, results)
+    publish_results(user_id, results)
+
+def publish_results(user_id: str, results: List[dict], sign: int = 1):
+    # Deltas are computed only for users with an open event stream
+    if not event_hub.listening(user_id):
+        return
+    if sign > 0:
+        event_hub.publish(user_id, 'results', {'count': len(results), 'results': results[:EVENTS_MAX_RESULTS]})
+    event_hub.publish(user_id, 'stats', rollup_delta(results, sign))
+    event_hub.publish(user_id, 'trends', trend_delta(results, sign))
+
+async def save_results(user_id: str, results: List[dict]):
+    if not results:
+        return
+    if len(results) == 1:
+        await db.sentiments.insert_one(encode_result(results[0]))
+    else:
+        await db.sentiments.insert_many([encode_result(result) for result in results])
+    await apply_views(user_id, results)
+
+write_behind_view_failures = registry.register(Counter(
+    'write_behind_view_failures_total', 'Written write-behind batches whose derived data failed to update.', ('view',)
+))
+
+async def flush_buffered_results(entries: List[tuple]):
+    # One insert for everything buffered, then one document-frequency update per keyword scope and one
+    # view update per user; entries are (user id, (result, candidate terms))
+    await db.sentiments.insert_many([encode_result(doc) for _, (doc, _) in entries], ordered=False)
+    # The results are stored from here on: a failure below must not fail the acks or count them as lost
+    by_user = {}
+    by_scope = {}
+    for user_id, (doc, terms) in entries:
+        by_user.setdefault(user_id, []).append(doc)
+        by_scope.setdefault(keyword_extractor.scope_for(user_id), []).append(terms)
+    for scope, batch in by_scope.items():
+        try:
+            await keyword_extractor.record(db, scope, batch)
+        except Exception:
+            # Document frequencies only weight keyword ranking; they catch up with later batches
+            write_behind_view_failures.inc('keywords')
+            logging.exception(f"Keyword frequency update failed for {len(batch)} buffered results")
+    for user_id, results in by_user.items():
+        try:
+            await apply_views(user_id, results)
+        except Exception:
+            write_behind_view_failures.inc('views')
+            logging.exception(f"View update failed for {len(results)} buffered results of user {user_id}")
+            try:
+                await mark_stale(db, user_id)
+            except Exception:
+                logging.exception(f"Could not mark the views of user {user_id} for rebuild")
+
+# Single-text inserts from concurrent requests are combined (WRITE_BEHIND_ENABLED=true)
+result_buffer = WriteBehindBuffer(flush_buffered_results) if WRITE_BEHIND_ENABLED else None
+
+async def analyze_and_store(user_id: str, texts: List[str], engine: Optional[str] = None) -> List[dict]:
+    analyses = await rank_keywords(user_id, await analysis_executor.analyze_many(texts, engine))
+    results = [build_result_doc(user_id, text, analysis) for text, analysis in zip(texts, analyses)]
+    await save_results(user_id, results)
+    return results
+
+@api_router.post("/analyze/text", response_model=SentimentResult)
+async def analyze_text(
+    input_data: TextInput,
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    durable: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    if not input_data.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
     
-    if not text_column:
-        # Use first column
-        text_column = fieldnames[0] if fieldnames else None
+    analysis = await analysis_executor.analyze(input_data.text, engine)
+    terms = analysis['terms']
+    # Buffered results count toward keyword document frequencies when their batch is flushed
+    await rank_keywords(current_user['id'], [analysis], update=result_buffer is None)
+    result_doc = build_result_doc(current_user['id'], input_data.text, analysis)
     
-    if not text_column:
-        raise HTTPException(status_code=400, detail="Could not find text column in CSV")
+    if result_buffer is None:
+        await save_results(current_user['id'], [result_doc])
+    else:
+        # durable=true waits for the batch holding this result to be written
+        try:
+            await result_buffer.submit(current_user['id'], (result_doc, terms), durable=durable)
+        except BufferFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
-    results = []
+    return SentimentResult(**result_doc)
+
+def parse_batch_body(body: bytes, content_type: str) -> List[BatchItem]:
+    # Accepts a JSON array or NDJSON; each entry is a string or {"text": ..., "client_id": ...}
+    try:
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            entries = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+        else:
+            entries = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if len(entries) > BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TEXTS} texts per batch")
+    
+    items = []
+    for index, entry in enumerate(entries):
+        try:
+            item = BatchItem(text=entry) if isinstance(entry, str) else BatchItem.model_validate(entry)
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"Invalid entry at index {index}")
+        if not item.text.strip():
+            raise HTTPException(status_code=400, detail=f"Text cannot be empty (index {index})")
+        items.append(item)
+    return items
+
+@api_router.post("/analyze/batch", response_model=List[BatchResult])
+async def analyze_batch_texts(
+    request: Request,
+    persist: bool = Query(True),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    current_user: dict = Depends(get_current_user)
+):
+    items = parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    analyses = await analysis_executor.analyze_many([item.text for item in items], engine)
+    await rank_keywords(current_user['id'], analyses, update=persist)
+    
+    if not persist:
+        return [
+            BatchResult(client_id=item.client_id, text=item.text, **analysis)
+            for item, analysis in zip(items, analyses)
+        ]
+    
+    results = [build_result_doc(current_user['id'], item.text, analysis) for item, analysis in zip(items, analyses)]
+    await save_results(current_user['id'], results)
+    return [BatchResult(client_id=item.client_id, **doc) for item, doc in zip(items, results)]
+
+async def ingest_upload(
+    fileobj,
+    user_id: str,
+    engine: Optional[str] = None,
+    job: Optional[Job] = None,
+    filename: str = "upload.csv",
+    text_column: Optional[str] = None,
+    json_path: Optional[str] = None
+) -> int:
+    # Decompress, parse, analyze and insert in fixed-size batches so memory does not grow with the upload
+    texts = iter_upload_texts(fileobj, filename, text_column, json_path)
     count = 0
-    for row in csv_reader:
-        if count >= 1000:  # Limit to 1000 rows
-            break
-        
-        text = row.get(text_column, '').strip()
-        if not text:
-            continue
-        
-        analysis = analyze_sentiment(text)
-        result_id = str(uuid.uuid4())
-        result_doc = {
-            "id": result_id,
-            "user_id": current_user['id'],
-            "text": text,
-            "sentiment": analysis['sentiment'],
-            "polarity": analysis['polarity'],
-            "subjectivity": analysis['subjectivity'],
-            "keywords": analysis['keywords'],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        results.append(result_doc)
-        count += 1
+    try:
+        for batch in iter_batches(texts, CSV_BATCH_SIZE):
+            results = await analyze_and_store(user_id, batch, engine)
+            count += len(results)
+            if job is not None:
+                job.advance(len(results))
+    except (IngestionError, UnicodeDecodeError) as e:
+        # Batches before the bad row are already stored; the error says how many
+        error = e if isinstance(e, IngestionError) else IngestionError("File must be UTF-8 encoded")
+        error.stored = count
+        raise error from e
+    return count
+
+@api_router.post("/analyze/csv")
+async def analyze_csv(
+    response: Response,
+    file: UploadFile = File(...),
+    background: bool = Query(False),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    text_column: Optional[str] = Query(None, max_length=256),
+    json_path: Optional[str] = Query(None, max_length=256),
+    current_user: dict = Depends(get_current_user)
+):
+    # CSV or JSON Lines, plain, gzipped or zipped (see ingestion.py). Texts are stored batch by batch, so an
+    # error partway through answers 200 with the stored `count` and an `error`; only an error before anything
+    # was stored is a 400.
+    try:
+        check_upload(file.filename)
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    source = {"filename": file.filename, "text_column": text_column, "json_path": json_path}
+    
+    if background:
+        # Checked before spooling so a tenant over the limit does not get another upload copied to disk
+        try:
+            job_scheduler.check_capacity(current_user['id'])
+        except TooManyJobs as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        # The upload is closed when this request ends, so the job gets its own (still compressed) copy
+        spool = tempfile.TemporaryFile()
+        await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+        spool.seek(0)
+        try:
+            job = job_scheduler.submit(
+                current_user['id'], 'csv',
+                lambda job: ingest_upload(spool, job.user_id, engine, job, **source),
+                cleanup=spool.close
+            )
+        except TooManyJobs as e:
+            spool.close()
+            raise HTTPException(status_code=429, detail=str(e))
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Analysis job queued", "job_id": job.id, "status": job.status}
     
-    if results:
-        await db.sentiments.insert_many(results)
+    try:
+        count = await ingest_upload(file.file, current_user['id'], engine, **source)
+    except IngestionError as e:
+        if not e.stored:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Part of the upload was stored before the error: report it rather than invite a duplicating retry
+        return {"message": f"Analyzed {e.stored} texts before an error", "count": e.stored, "error": str(e)}
     
-    return {"message": f"Analyzed {len(results)} texts", "count": len(results)}
+    return {"message": f"Analyzed {count} texts", "count": count}
+
+# ============ JOB ROUTES ============
+
+@api_router.get("/jobs")
+async def get_jobs(current_user: dict = Depends(get_token_user)):
+    return [job.to_dict() for job in job_scheduler.list_for_user(current_user['id'])]
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_token_user)):
+    try:
+        return job_scheduler.get(job_id, current_user['id']).to_dict()
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+@api_router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return job_scheduler.cancel(job_id, current_user['id']).to_dict()
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+# Sort order of the history list; continuation tokens encode these fields of the last stored row
+SENTIMENT_PAGE_KEYS = ["created_at", "_id"]
 
 @api_router.get("/sentiments", response_model=List[SentimentResult])
 async def get_sentiments(
+    response: Response,
     sentiment: Optional[str] = Query(None),
     limit: int = Query(100, le=500),
     skip: int = Query(0),
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_token_user)
 ):
     query = {"user_id": current_user['id']}
     if sentiment and sentiment in ['positive', 'negative', 'neutral']:
-        query['sentiment'] = sentiment
-    
-    results = await db.sentiments.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    return results
+        query['sentiment'] = {"$in": label_values(sentiment)}
+    if cursor:
+        # Seek past the last row of the previous page instead of skipping over it
+        try:
+            values = decode_cursor(cursor, len(SENTIMENT_PAGE_KEYS))
+            seek = keyset_filter(SENTIMENT_PAGE_KEYS, values)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(values[0], datetime):
+            # Range operators only match their own BSON type; unmigrated string timestamps sort after every date
+            seek = {"$or": [seek, {"created_at": {"$type": "string"}}]}
+        query.update(seek)
+    
+    sort = [(key, -1) for key in SENTIMENT_PAGE_KEYS]
+    docs = await db.sentiments.find(query, RESULT_PROJECTION).sort(sort).skip(skip).limit(limit).to_list(limit)
+    token = next_cursor(docs, SENTIMENT_PAGE_KEYS, limit)
+    return json_response(
+        [decode_result(doc) for doc in docs], response, {NEXT_CURSOR_HEADER: token} if token else None
+    )
 
 @api_router.get("/sentiments/stats", response_model=SentimentStats)
-async def get_stats(current_user: dict = Depends(get_current_user)):
-    query = {"user_id": current_user['id']}
-    
-    all_sentiments = await db.sentiments.find(query, {"_id": 0}).to_list(10000)
-    
-    total = len(all_sentiments)
-    positive = sum(1 for s in all_sentiments if s['sentiment'] == 'positive')
-    negative = sum(1 for s in all_sentiments if s['sentiment'] == 'negative')
-    neutral = sum(1 for s in all_sentiments if s['sentiment'] == 'neutral')
-    
-    avg_polarity = sum(s['polarity'] for s in all_sentiments) / total if total > 0 else 0
+async def get_stats(current_user: dict = Depends(get_token_user)):
+    # Point read of the rollup maintained on every write
+    rollup = await read_rollup(db, current_user['id'])
+    total = rollup['total']
+    avg_polarity = rollup['polarity_sum'] / total if total > 0 else 0
     
     return SentimentStats(
         total=total,
-        positive=positive,
-        negative=negative,
-        neutral=neutral,
+        positive=rollup['positive'],
+        negative=rollup['negative'],
+        neutral=rollup['neutral'],
         avg_polarity=round(avg_polarity, 3)
     )
 
 @api_router.get("/sentiments/trends", response_model=List[TrendPoint])
-async def get_trends(days: int = Query(7, le=30), current_user: dict = Depends(get_current_user)):
-    query = {"user_id": current_user['id']}
-    all_sentiments = await db.sentiments.find(query, {"_id": 0}).to_list(10000)
-    
-    # Group by date
-    trends = {}
-    for s in all_sentiments:
-        date = s['created_at'][:10]  # Extract date (YYYY-MM-DD)
-        if date not in trends:
-            trends[date] = {'positive': 0, 'negative': 0, 'neutral': 0}
-        trends[date][s['sentiment']] += 1
-    
-    # Convert to list and sort by date
-    trend_list = [
-        TrendPoint(date=date, **counts)
-        for date, counts in sorted(trends.items())
-    ]
+async def get_trends(
+    response: Response,
+    days: int = Query(7, le=30),
+    tz: str = Query("UTC"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    granularity: str = Query("day", pattern="^(day|hour)$"),
+    current_user: dict = Depends(get_token_user)
+):
+    try:
+        zone = None if tz.upper() == "UTC" else ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {tz}")
     
-    return trend_list[-days:]
+    # Range scan over the pre-aggregated trend buckets
+    points = await read_trends(db, current_user['id'], days=days, tz=zone, start=start, end=end, granularity=granularity)
+    return json_response(points, response)
 
 @api_router.get("/sentiments/keywords")
-async def get_top_keywords(limit: int = Query(20, le=50), current_user: dict = Depends(get_current_user)):
-    query = {"user_id": current_user['id']}
-    all_sentiments = await db.sentiments.find(query, {"_id": 0}).to_list(10000)
-    
-    all_keywords = []
-    for s in all_sentiments:
-        all_keywords.extend(s.get('keywords', []))
-    
-    keyword_freq = Counter(all_keywords)
-    top_keywords = [{'word': word, 'count': count} for word, count in keyword_freq.most_common(limit)]
-    
-    return top_keywords
+async def get_top_keywords(
+    response: Response,
+    limit: int = Query(20, le=50),
+    current_user: dict = Depends(get_token_user)
+):
+    # Top-k read from the keyword index maintained on write
+    return json_response(await read_top_keywords(db, current_user['id'], limit), response)
 
 @api_router.delete("/sentiments/{sentiment_id}")
 async def delete_sentiment(sentiment_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.sentiments.delete_one({"id": sentiment_id, "user_id": current_user['id']})
-    if result.deleted_count == 0:
+    # While a migration runs a result can exist in both formats; every copy goes, the views count it once
+    query = {**id_filter(sentiment_id), "user_id": current_user['id']}
+    deleted = await db.sentiments.find_one(
+        query, {"_id": 0, "sentiment": 1, "polarity": 1, "created_at": 1, "keywords": 1}
+    )
+    if deleted is None or not (await db.sentiments.delete_many(query)).deleted_count:
         raise HTTPException(status_code=404, detail="Sentiment not found")
+    deleted = decode_result(deleted)
+    await apply_rollup(db, current_user['id'], [deleted], sign=-1)
+    await apply_trends(db, current_user['id'], [deleted], sign=-1)
+    await apply_keywords(db, current_user['id'], [deleted], sign=-1)
+    event_hub.publish(current_user['id'], 'deleted', {'id': sentiment_id})
+    publish_results(current_user['id'], [deleted], sign=-1)
     return {"message": "Deleted successfully"}
 
 # ============ ADMIN ROUTES ============
 
-@api_router.get("/admin/users")
-async def get_all_users(current_user: dict = Depends(get_current_user)):
+USER_PAGE_KEYS = ["created_at", "id"]
+USER_SEARCH_KEYS = ["email"]
+USER_PROJECTION = {"_id": 0, **{field: 1 for field in User.model_fields}}
+
+@api_router.get("/admin/users", response_model=List[User])
+async def get_all_users(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=254),
+    is_admin: Optional[bool] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
     if not current_user.get('is_admin', False):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    return users
+    # Searches are email-prefix range scans on the unique email index, ordered by email
+    query = {}
+    if q:
+        query['email'] = {"$regex": f"^{re.escape(q.strip().lower())}"}
+        keys, descending = USER_SEARCH_KEYS, False
+    else:
+        keys, descending = USER_PAGE_KEYS, True
+    if is_admin is not None:
+        query['is_admin'] = is_admin
+    if cursor:
+        try:
+            seek = keyset_filter(keys, decode_cursor(cursor, len(keys)), descending)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # $and keeps the seek bound from replacing the email prefix condition
+        query = {"$and": [query, seek]} if query else seek
+    
+    sort = [(key, -1 if descending else 1) for key in keys]
+    users = await db.users.find(query, USER_PROJECTION).sort(sort).limit(limit).to_list(limit)
+    token = next_cursor(users, keys, limit)
+    return json_response(users, response, {NEXT_CURSOR_HEADER: token} if token else None)
+
+# Dashboard counts are served from a snapshot refreshed every ADMIN_STATS_REFRESH seconds
+admin_snapshot = LRUCache(1, ttl=ADMIN_STATS_REFRESH)
 
 @api_router.get("/admin/stats")
-async def get_admin_stats(current_user: dict = Depends(get_current_user)):
+async def get_admin_stats(response: Response, current_user: dict = Depends(get_current_user)):
     if not current_user.get('is_admin', False):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    total_users = await db.users.count_documents({})
-    total_analyses = await db.sentiments.count_documents({})
-    
-    # Get recent activity
-    recent_analyses = await db.sentiments.find({}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
+    snapshot = admin_snapshot.get('stats')
+    if snapshot is None:
+        # Collection metadata counts instead of full scans; the newest results come off the created_at index
+        recent = await db.sentiments.find({}, RESULT_PROJECTION).sort("created_at", -1).limit(10).to_list(10)
+        snapshot = {
+            "total_users": await db.users.estimated_document_count(),
+            "total_analyses": await db.sentiments.estimated_document_count(),
+            "recent_analyses": [decode_result(doc) for doc in recent],
+            "as_of": datetime.now(timezone.utc).isoformat()
+        }
+        admin_snapshot.set('stats', snapshot)
+    return json_response(snapshot, response)
+
+@api_router.get("/admin/analysis")
+async def get_analysis_stats(current_user: dict = Depends(get_current_user)):
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin access required")
     
     return {
-        "total_users": total_users,
-        "total_analyses": total_analyses,
-        "recent_analyses": recent_analyses
+        **analysis_executor.stats(),
+        "jobs": job_scheduler.stats(),
+        "password_hashing": hash_timings.stats(),
+        "keywords": keyword_extractor.stats(),
+        "write_behind": result_buffer.stats() if result_buffer is not None else {"enabled": False},
+        "serialization": serializer_stats(),
+        "events": event_hub.stats()
     }
 
-# ============ EXPORT ROUTES ============
-
-@api_router.get("/export/csv")
-async def export_csv(current_user: dict = Depends(get_current_user)):
-    from fastapi.responses import StreamingResponse
+@api_router.get("/admin/diagnostics/indexes")
+async def get_index_diagnostics(current_user: dict = Depends(get_current_user)):
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    query = {"user_id": current_user['id']}
-    sentiments = await db.sentiments.find(query, {"_id": 0}).to_list(10000)
+    return await explain_queries(db)
+
+@api_router.get("/health")
+async def health(response: Response):
+    if not startup_report.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return startup_report.to_dict()
+
+@api_router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, current_user: dict = Depends(get_current_user)):
+    if not current_user.get('is_admin', False):
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=['text', 'sentiment', 'polarity', 'subjectivity', 'keywords', 'created_at'])
-    writer.writeheader()
+    # Collapsed stacks recorded for a request sent with X-Profile: 1
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+# ============ EVENT ROUTES ============
+
+async def event_user(token: Optional[str], authorization: Optional[str] = None) -> dict:
+    # EventSource and browser WebSockets cannot set headers, so the token may come in the query string
+    if not token and authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return await load_user(decode_token(token)['user_id'])
+
+@api_router.get("/events")
+async def stream_events(
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None)
+):
+    if not EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Event streams are disabled")
+    user = await event_user(token, authorization)
+    try:
+        subscription = event_hub.subscribe(user['id'], 'sse')
+    except TooManyConnections as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     
-    for s in sentiments:
-        writer.writerow({
-            'text': s['text'],
-            'sentiment': s['sentiment'],
-            'polarity': s['polarity'],
-            'subjectivity': s['subjectivity'],
-            'keywords': ', '.join(s.get('keywords', [])),
-            'created_at': s['created_at']
-        })
+    async def stream():
+        yield b"retry: 5000\n\n"
+        async for message in subscription:
+            yield format_sse(message)
     
-    output.seek(0)
+    # The background task also runs when the client disconnects mid-stream
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=sentiment_analysis.csv"}
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(event_hub.unsubscribe, subscription)
+    )
+
+@api_router.websocket("/events/ws")
+async def events_socket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    try:
+        if not EVENTS_ENABLED:
+            raise TooManyConnections("Event streams are disabled")
+        user = await event_user(token)
+        subscription = event_hub.subscribe(user['id'], 'websocket')
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except TooManyConnections:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    
+    await websocket.accept()
+    
+    async def watch_disconnect():
+        # The channel is one-way; anything the client sends is read and ignored
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+        subscription.queue.put_nowait(None)
+    
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for message in subscription:
+            await websocket.send_text(format_ws(message))
+        if not watcher.done():
+            await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        # The client went away mid-send
+        pass
+    finally:
+        watcher.cancel()
+        event_hub.unsubscribe(subscription)
+
+# ============ EXPORT ROUTES ============
+
+@api_router.get("/export/csv")
+async def export_csv(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False),
+    current_user: dict = Depends(get_token_user)
+):
+    query = {"user_id": current_user['id']}
+    cursor = db.sentiments.find(query, EXPORT_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+    
+    # Rows are encoded (and optionally compressed) as the cursor yields them
+    filename = f"sentiment_analysis.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_stream(cursor, format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 # Root route
@@ -434,6 +830,14 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Metrics are disabled until METRICS_TOKEN is set")
+    if not authorized(request.headers.get('authorization')):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 origins = os.environ.get("CORS_ORIGINS", "").split(",")
 
 app.add_middleware(
@@ -442,8 +846,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PROFILE_ID_HEADER],
 )
 
+async def may_profile(headers: dict) -> bool:
+    # The operator's metrics token, or an admin's bearer token
+    token = headers.get(PROFILE_TOKEN_HEADER)
+    if token is not None and authorized(f"Bearer {token.decode('latin-1')}"):
+        return True
+    scheme, _, credentials = headers.get(b'authorization', b'').decode('latin-1').partition(' ')
+    if scheme.lower() != 'bearer' or not credentials:
+        return False
+    try:
+        user = await load_user(decode_token(credentials)['user_id'])
+    except (HTTPException, KeyError):
+        return False
+    return user.get('is_admin', False)
+
+# Outermost, so latency covers CORS handling and the whole streamed body
+app.add_middleware(ProfilingMiddleware, authorize=may_profile)
+app.add_middleware(MetricsMiddleware)
+
 
 # Configure logging
 logging.basicConfig(
@@ -452,6 +875,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+import_seconds = process_age()
+if import_seconds is not None:
+    startup_report.record('import', import_seconds)
+
+@app.on_event("startup")
+async def startup():
+    # The worker only reports ready once every phase has finished
+    with startup_report.phase('warmup'):
+        workers = await analysis_executor.warm()
+    with startup_report.phase('mongo'):
+        await ping_mongo(client)
+    with startup_report.phase('indexes'):
+        await ensure_indexes(db)
+    startup_report.ready = True
+    logger.info(f"Worker ready with {workers} warm analysis workers: {startup_report.phases}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    startup_report.ready = False
+    await event_hub.close()
+    await job_scheduler.shutdown()
+    if result_buffer is not None:
+        await result_buffer.close()
+    client.close()
+    analysis_executor.shutdown()
+    shutdown_hash_pool()
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""Startup phases and their timings.
+
+Heavy, read-only state (lexicons, tokenizer data) is loaded while server.py is
+imported, so a pre-forking server shares it copy-on-write across workers:
+
+    gunicorn server:app -k uvicorn.workers.UvicornWorker --preload --workers 4
+
+`uvicorn --workers` spawns rather than forks and gets no sharing. The
+analysis pool starts its processes from a forkserver that has imported the
+engines (ANALYSIS_START_METHOD=fork shares the preloaded lexicons instead, at
+the cost of forking a threaded process); each pool process loads the lexicons
+in its initializer. Each worker then
+runs the startup event (warm the pool, ping Mongo, apply indexes) and only
+reports ready once that has finished.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+# Startup configuration
+PRELOAD_ANALYZER = os.environ.get('PRELOAD_ANALYZER', 'true').lower() == 'true'
+STARTUP_MONGO_TIMEOUT = float(os.environ.get('STARTUP_MONGO_TIMEOUT', '10'))
+
+startup_phase_seconds = registry.register(Gauge(
+    'startup_phase_seconds', 'Time spent in each startup phase of this worker.', ('phase',)
+))
+
+
+class StartupReport:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = round(seconds, 3)
+        startup_phase_seconds.set(seconds, phase)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def to_dict(self) -> dict:
+        return {'ready': self.ready, 'pid': os.getpid(), 'phases': dict(self.phases)}
+
+
+startup_report = StartupReport()
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux only), which covers interpreter start-up and imports."""
+    try:
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+async def ping_mongo(client, timeout: float = STARTUP_MONGO_TIMEOUT):
+    # Opens the first pooled connection; a worker that cannot reach Mongo must not report ready
+    try:
+        await asyncio.wait_for(client.admin.command('ping'), timeout)
+    except Exception as e:
+        logger.error(f"MongoDB is not reachable: {str(e)}")
+        raise
@@ -0,0 +1,213 @@
+"""Storage format for analysis results.
+
+The API always sees the same result shape. What is stored depends on
+STORAGE_SCHEMA:
+
+- legacy: `id` (UUID string) next to an ObjectId `_id`, `sentiment` as the
+  label string and `created_at` as an ISO string.
+- compact: the UUID itself is `_id` (BSON binary), `sentiment` is a small
+  integer code, `created_at` is a BSON datetime, and texts longer than
+  TEXT_COMPRESS_MIN_BYTES are zlib-compressed into `text_z`.
+
+Readers decode both, so the two formats can coexist while a migration runs.
+BSON orders strings before dates, so a descending (created_at, _id) sort still
+lists every compact result before the (older) legacy ones. Convert existing
+results in batches while the app keeps serving (one migration at a time):
+
+    python storage.py migrate [--batch-size 1000] [--pause-ms 0] [--user USER_ID]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from bson import Binary
+from bson.binary import UuidRepresentation
+from pymongo.errors import BulkWriteError
+
+# Storage configuration
+STORAGE_SCHEMA = os.environ.get('STORAGE_SCHEMA', 'compact')
+TEXT_COMPRESS_MIN_BYTES = int(os.environ.get('TEXT_COMPRESS_MIN_BYTES', '1024'))
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '1000'))
+
+SCHEMAS = ('legacy', 'compact')
+LABEL_CODES = {'negative': -1, 'neutral': 0, 'positive': 1}
+LABELS_BY_CODE = {code: label for label, code in LABEL_CODES.items()}
+
+# Stored fields that make up an API result, in either format
+RESULT_PROJECTION = {field: 1 for field in (
+    'id', 'user_id', 'text', 'text_z', 'sentiment', 'polarity', 'subjectivity', 'keywords', 'created_at'
+)}
+
+DUPLICATE_KEY = 11000
+
+
+def label_of(value) -> str:
+    return LABELS_BY_CODE[value] if isinstance(value, int) else value
+
+
+def label_values(label: str) -> list:
+    """Stored values for a label in either format, for $in filters."""
+    return [label, LABEL_CODES[label]]
+
+
+def id_to_key(result_id: str):
+    """_id of a compact result; None when the id cannot be one."""
+    try:
+        return Binary.from_uuid(uuid.UUID(result_id), UuidRepresentation.STANDARD)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def id_filter(result_id: str) -> dict:
+    key = id_to_key(result_id)
+    if key is None:
+        return {"id": result_id}
+    return {"$or": [{"_id": key}, {"id": result_id}]}
+
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+
+
+def format_timestamp(value) -> str:
+    if isinstance(value, datetime):
+        # BSON datetimes come back naive and in UTC
+        return value.replace(tzinfo=timezone.utc).isoformat(timespec='milliseconds')
+    return value
+
+
+def encode_result(result: dict, schema: Optional[str] = None) -> dict:
+    """Stored document for an API-shaped result."""
+    if (schema or STORAGE_SCHEMA) == 'legacy':
+        return dict(result)
+    doc = {
+        "_id": id_to_key(result['id']),
+        "user_id": result['user_id'],
+        "sentiment": LABEL_CODES[result['sentiment']],
+        "polarity": result['polarity'],
+        "subjectivity": result['subjectivity'],
+        "keywords": result['keywords'],
+        "created_at": parse_timestamp(result['created_at'])
+    }
+    text = result['text']
+    raw = text.encode('utf-8')
+    if TEXT_COMPRESS_MIN_BYTES and len(raw) >= TEXT_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            doc["text_z"] = Binary(packed)
+            return doc
+    doc["text"] = text
+    return doc
+
+
+def decode_result(doc: dict) -> dict:
+    """API-shaped result for a stored document in either format (projections may omit fields)."""
+    out = {k: v for k, v in doc.items() if k not in ('_id', 'text_z')}
+    if 'id' not in doc and isinstance(doc.get('_id'), uuid.UUID):
+        out['id'] = str(doc['_id'])
+    elif 'id' not in doc and isinstance(doc.get('_id'), Binary):
+        out['id'] = str(doc['_id'].as_uuid(UuidRepresentation.STANDARD))
+    if 'text_z' in doc:
+        out['text'] = zlib.decompress(doc['text_z']).decode('utf-8')
+    if 'sentiment' in doc:
+        out['sentiment'] = label_of(doc['sentiment'])
+    if 'created_at' in doc:
+        out['created_at'] = format_timestamp(doc['created_at'])
+    return out
+
+
+def hour_expression(field: str = "$created_at") -> dict:
+    """Aggregation expression for the UTC hour bucket (YYYY-MM-DDTHH) of either timestamp format."""
+    return {"$cond": [
+        {"$eq": [{"$type": field}, "date"]},
+        {"$dateToString": {"format": "%Y-%m-%dT%H", "date": field}},
+        {"$substr": [field, 0, 13]}
+    ]}
+
+# ============ MIGRATION ============
+
+async def migrate_batch(db, docs: List[dict]) -> int:
+    """Replace a batch of legacy results by compact copies; returns how many were converted.
+
+    Results whose id is not a UUID cannot be keyed by it and stay legacy. An
+    original is deleted only once its compact copy is confirmed, and a copy is
+    dropped again when its original was deleted by a user in the meantime.
+    """
+    originals = {}
+    for doc in docs:
+        key = id_to_key(doc['id'])
+        if key is not None:
+            originals[key] = doc
+    if not originals:
+        return 0
+    compact = [encode_result(decode_result(doc), 'compact') for doc in originals.values()]
+    try:
+        await db.sentiments.insert_many(compact, ordered=False)
+    except BulkWriteError as e:
+        # A rerun after an interrupted batch finds some results already converted
+        if any(error.get('code') != DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+            raise
+    # A delete that ran between reading the batch and inserting missed the new copy
+    remaining = {doc['_id'] async for doc in db.sentiments.find(
+        {"_id": {"$in": [doc['_id'] for doc in originals.values()]}}, {"_id": 1}
+    )}
+    gone = [key for key, doc in originals.items() if doc['_id'] not in remaining]
+    if gone:
+        await db.sentiments.delete_many({"_id": {"$in": gone}})
+    confirmed = [doc['_id'] async for doc in db.sentiments.find(
+        {"_id": {"$in": [key for key in originals if key not in gone]}}, {"_id": 1}
+    )]
+    await db.sentiments.delete_many({"_id": {"$in": [originals[key]['_id'] for key in confirmed]}})
+    return len(confirmed)
+
+
+async def migrate(db, batch_size: int = MIGRATION_BATCH_SIZE, pause: float = 0.0, user_id: Optional[str] = None) -> int:
+    """Convert legacy results to the compact format, one batch at a time.
+
+    Each batch inserts the compact copies before deleting the originals, so a
+    result is never missing; readers may briefly see both copies of a batch.
+    Batches page by `_id`, so results left legacy are not read again.
+    """
+    query = {"id": {"$exists": True}}
+    if user_id:
+        query["user_id"] = user_id
+    migrated = 0
+    while True:
+        docs = await db.sentiments.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return migrated
+        query["_id"] = {"$gt": docs[-1]['_id']}
+        migrated += await migrate_batch(db, docs)
+        print(f"Migrated {migrated} results")
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def _main(args):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        started = time.perf_counter()
+        migrated = await migrate(db, args.batch_size, args.pause_ms / 1000, args.user)
+        print(f"Migrated {migrated} results in {time.perf_counter() - started:.1f}s")
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert stored results to the compact format")
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument('--pause-ms', type=float, default=0.0, help="sleep between batches to limit load")
+    parser.add_argument('--user', help="only migrate this user's results")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,161 @@
+"""Write-behind buffer for single results.
+
+With WRITE_BEHIND_ENABLED=true, `/api/analyze/text` hands its result to a
+shared buffer instead of inserting it itself. One background task flushes the
+buffer with a single insert_many once WRITE_BEHIND_BATCH_SIZE results are
+waiting or WRITE_BEHIND_DELAY_MS has passed since the first one arrived.
+
+Results are acknowledged before they are written, so a crash can lose up to
+one buffer of them and a read straight after the write may not see it yet.
+Callers that need the write to be durable ask for it and wait for the flush.
+When WRITE_BEHIND_MAX_PENDING results are waiting, new ones wait for room and
+are rejected with BufferFull after WRITE_BEHIND_MAX_WAIT_MS.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+# Write-behind configuration
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '200'))
+WRITE_BEHIND_DELAY_MS = float(os.environ.get('WRITE_BEHIND_DELAY_MS', '5'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+WRITE_BEHIND_MAX_WAIT_MS = float(os.environ.get('WRITE_BEHIND_MAX_WAIT_MS', '1000'))
+
+write_behind_pending = registry.register(Gauge(
+    'write_behind_pending', 'Results waiting in the write-behind buffer.'
+))
+write_behind_flush_duration = registry.register(Histogram(
+    'write_behind_flush_seconds', 'Time to write one batch from the write-behind buffer.'
+))
+write_behind_lost = registry.register(Counter(
+    'write_behind_lost_total', 'Acknowledged results that could not be written.'
+))
+
+# (user id, item, durability future); the item is whatever the flush callback expects
+Entry = Tuple[str, Any, Optional[asyncio.Future]]
+
+
+class BufferFull(Exception):
+    pass
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        flush: Callable[[List[Tuple[str, Any]]], Awaitable[None]],
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        delay: float = WRITE_BEHIND_DELAY_MS / 1000,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        max_wait: float = WRITE_BEHIND_MAX_WAIT_MS / 1000
+    ):
+        self._flush = flush
+        self.batch_size = max(1, batch_size)
+        self.delay = delay
+        self.max_pending = max_pending
+        self.max_wait = max_wait
+        self._pending: List[Entry] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._has_items: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushes = 0
+        self.written = 0
+
+    def _start(self):
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, user_id: str, item: Any, durable: bool = False):
+        """Queue one result; with durable=True, return only once it has been written."""
+        if self._closing:
+            raise BufferFull("Write-behind buffer is shutting down")
+        if self._task is None:
+            self._start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            raise BufferFull("Write-behind buffer is full")
+
+        future = asyncio.get_running_loop().create_future() if durable else None
+        self._pending.append((user_id, item, future))
+        write_behind_pending.set(len(self._pending))
+        self._has_items.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if not self._pending and self._closing:
+                return
+            if len(self._pending) < self.batch_size and not self._closing:
+                # Linger briefly so concurrent requests land in the same insert_many
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            write_behind_pending.set(len(self._pending))
+            if len(self._pending) < self.batch_size:
+                self._batch_full.clear()
+            if not self._pending and not self._closing:
+                self._has_items.clear()
+            await self._write(batch)
+
+    async def _write(self, batch: List[Entry]):
+        started = time.perf_counter()
+        try:
+            await self._flush([(user_id, item) for user_id, item, _ in batch])
+            error = None
+        except Exception as e:
+            error = e
+            logger.error(f"Write-behind flush of {len(batch)} results failed: {str(e)}")
+        write_behind_flush_duration.observe(time.perf_counter() - started)
+
+        self.flushes += 1
+        for _, _, future in batch:
+            self._slots.release()
+            if future is None or future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+        if error is None:
+            self.written += len(batch)
+        else:
+            write_behind_lost.inc(amount=sum(1 for _, _, future in batch if future is None))
+
+    async def close(self):
+        """Stop taking results and write everything still buffered."""
+        self._closing = True
+        if self._task is None:
+            return
+        self._has_items.set()
+        self._batch_full.set()
+        await self._task
+
+    def stats(self) -> dict:
+        return {
+            'enabled': True,
+            'pending': len(self._pending),
+            'batch_size': self.batch_size,
+            'delay_ms': self.delay * 1000,
+            'max_pending': self.max_pending,
+            'flushes': self.flushes,
+            'written': self.written
+        }
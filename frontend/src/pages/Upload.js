@@ -5,16 +5,21 @@ import Layout from '@/components/Layout';
 import { Card } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
+import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { toast } from 'sonner';
 import { Upload as UploadIcon, FileText, Loader2 } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Formats the backend ingests (see backend/ingestion.py): plain, gzipped or zipped
+const UPLOAD_ACCEPT = '.csv,.jsonl,.ndjson,.gz,.zip';
 
 export default function Upload({ user, onLogout }) {
   const [text, setText] = useState('');
   const [file, setFile] = useState(null);
+  const [textColumn, setTextColumn] = useState('');
+  const [jsonPath, setJsonPath] = useState('');
   const [loading, setLoading] = useState(false);
   const navigate = useNavigate();
 
@@ -46,7 +51,7 @@ export default function Upload({ user, onLogout }) {
   const handleFileUpload = async (e) => {
     e.preventDefault();
     if (!file) {
-      toast.error('Please select a CSV file');
+      toast.error('Please select a file');
       return;
     }
 
@@ -55,18 +60,27 @@ export default function Upload({ user, onLogout }) {
       const token = localStorage.getItem('token');
       const formData = new FormData();
       formData.append('file', file);
+      const params = {};
+      if (textColumn.trim()) params.text_column = textColumn.trim();
+      if (jsonPath.trim()) params.json_path = jsonPath.trim();
 
       const response = await axios.post(
         `${API}/analyze/csv`,
         formData,
         {
+          params,
           headers: {
             Authorization: `Bearer ${token}`,
             'Content-Type': 'multipart/form-data'
           }
         }
       );
-      toast.success(`Analyzed ${response.data.count} texts successfully!`);
+      if (response.data.error) {
+        // Rows before the error were saved; retrying the whole file would store them twice
+        toast.warning(`Analyzed ${response.data.count} texts, then stopped: ${response.data.error}`);
+      } else {
+        toast.success(`Analyzed ${response.data.count} texts successfully!`);
+      }
       setFile(null);
       setTimeout(() => navigate('/analysis'), 500);
     } catch (error) {
@@ -82,7 +96,7 @@ export default function Upload({ user, onLogout }) {
         {/* Header */}
         <div>
           <h1 className="text-4xl font-extrabold tracking-tight font-heading">Upload Data</h1>
-          <p className="text-base text-muted-foreground mt-2">Analyze text manually or upload a CSV file</p>
+          <p className="text-base text-muted-foreground mt-2">Analyze text manually or upload a CSV or JSON Lines file</p>
         </div>
 
         <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
@@ -127,22 +141,22 @@ export default function Upload({ user, onLogout }) {
             </div>
           </Card>
 
-          {/* CSV File Upload */}
+          {/* File Upload */}
           <Card className="p-8 border" data-testid="csv-upload-card">
             <div className="space-y-6">
               <div className="flex items-center space-x-3">
                 <UploadIcon className="h-6 w-6" strokeWidth={1.5} />
-                <h3 className="text-xl font-semibold tracking-normal font-heading">CSV File Upload</h3>
+                <h3 className="text-xl font-semibold tracking-normal font-heading">File Upload</h3>
               </div>
 
               <form onSubmit={handleFileUpload} className="space-y-4">
                 <div className="space-y-2">
-                  <Label htmlFor="file">Upload CSV file</Label>
+                  <Label htmlFor="file">Upload a CSV or JSON Lines file</Label>
                   <div className="border-2 border-dashed border-border rounded-md p-8 text-center hover:border-primary/50 transition-colors duration-200">
                     <input
                       id="file"
                       type="file"
-                      accept=".csv"
+                      accept={UPLOAD_ACCEPT}
                       onChange={(e) => setFile(e.target.files[0])}
                       className="hidden"
                       data-testid="file-input"
@@ -150,18 +164,41 @@ export default function Upload({ user, onLogout }) {
                     <label htmlFor="file" className="cursor-pointer">
                       <UploadIcon className="h-12 w-12 mx-auto mb-4 text-muted-foreground" strokeWidth={1.5} />
                       <p className="text-base font-medium mb-1">
-                        {file ? file.name : 'Click to upload CSV'}
+                        {file ? file.name : 'Click to upload a file'}
                       </p>
                       <p className="text-sm text-muted-foreground">
-                        CSV file with text column
+                        .csv, .jsonl or .ndjson, optionally gzipped (.gz) or in a .zip
                       </p>
                     </label>
                   </div>
                 </div>
 
+                <div className="grid grid-cols-1 sm:grid-cols-2 gap-4">
+                  <div className="space-y-2">
+                    <Label htmlFor="text-column">Text column (optional)</Label>
+                    <Input
+                      id="text-column"
+                      placeholder="text"
+                      value={textColumn}
+                      onChange={(e) => setTextColumn(e.target.value)}
+                      data-testid="text-column-input"
+                    />
+                  </div>
+                  <div className="space-y-2">
+                    <Label htmlFor="json-path">JSON path (optional)</Label>
+                    <Input
+                      id="json-path"
+                      placeholder="review.body"
+                      value={jsonPath}
+                      onChange={(e) => setJsonPath(e.target.value)}
+                      data-testid="json-path-input"
+                    />
+                  </div>
+                </div>
+
                 <div className="bg-muted p-4 rounded-md">
                   <p className="text-sm text-muted-foreground">
-                    <strong>CSV Format:</strong> Your CSV should have a column named "text", "content", "tweet", or "review" containing the text to analyze.
+                    <strong>Format:</strong> By default the text is read from a CSV column or JSON key named "text", "content", "tweet", "review" or "message"; a JSON line that is a plain string is used as is. Name another column or key above, or a JSON path such as "messages.0.text".
                   </p>
                 </div>
 
@@ -185,16 +222,25 @@ export default function Upload({ user, onLogout }) {
           </Card>
         </div>
 
-        {/* Sample CSV */}
+        {/* Sample formats */}
         <Card className="p-6 border" data-testid="sample-csv-card">
-          <h3 className="text-xl font-semibold tracking-normal font-heading mb-4">Sample CSV Format</h3>
-          <div className="bg-muted p-4 rounded-md font-mono text-sm overflow-x-auto">
-            <pre>
+          <h3 className="text-xl font-semibold tracking-normal font-heading mb-4">Sample Formats</h3>
+          <div className="grid grid-cols-1 lg:grid-cols-2 gap-4">
+            <div className="bg-muted p-4 rounded-md font-mono text-sm overflow-x-auto">
+              <pre>
 text
 "This product is amazing! I love it."
 "Terrible experience. Would not recommend."
 "It's okay, nothing special."
-            </pre>
+              </pre>
+            </div>
+            <div className="bg-muted p-4 rounded-md font-mono text-sm overflow-x-auto" data-testid="sample-jsonl">
+              <pre>
+{'{"text": "This product is amazing! I love it."}\n'}
+{'{"review": "Terrible experience. Would not recommend."}\n'}
+{'"It\'s okay, nothing special."'}
+              </pre>
+            </div>
           </div>
         </Card>
       </div>
@@ -0,0 +1,71 @@
+"""The lexicon engine must score every text exactly as TextBlob's PatternAnalyzer does."""
+import csv
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from textblob import TextBlob
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+
+from lexicon_engine import PARITY_SAMPLES, PARITY_TOLERANCE, get_lexicon  # noqa: E402
+
+RANDOM_SEED = 1234
+RANDOM_SENTENCES = 500
+FILLER = ["the", "movie", "was", "and", "it", "service", "food", "i", "we", "this", "a", "of"]
+PUNCTUATION = ["!", "!!!", ".", ",", "?", "(!)"]
+
+
+def random_sentences(count: int, seed: int = RANDOM_SEED):
+    """Sentences mixing lexicon words, negations, modifiers, emoticons and punctuation."""
+    lexicon = get_lexicon()
+    rng = random.Random(seed)
+    words = sorted(lexicon.entries)
+    modifiers = sorted(word for word, entry in lexicon.entries.items() if entry[3])
+    pools = [words, words, modifiers, sorted(lexicon.negations), sorted(lexicon.emoticons), FILLER, PUNCTUATION]
+    sentences = []
+    for _ in range(count):
+        tokens = [rng.choice(rng.choice(pools)) for _ in range(rng.randint(1, 12))]
+        sentences.append(" ".join(tokens))
+    return sentences
+
+
+def sample_data():
+    with open(ROOT / 'sample_data.csv', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row[0] for row in reader if row]
+
+
+def assert_parity(texts):
+    polarity, subjectivity, _ = get_lexicon().score_batch(texts)
+    mismatches = []
+    for text, p, s in zip(texts, polarity, subjectivity):
+        want = TextBlob(text).sentiment
+        if abs(want.polarity - p) > PARITY_TOLERANCE or abs(want.subjectivity - s) > PARITY_TOLERANCE:
+            mismatches.append((text, (want.polarity, want.subjectivity), (float(p), float(s))))
+    assert not mismatches, f"{len(mismatches)} of {len(texts)} texts differ, e.g. {mismatches[:5]}"
+
+
+def test_parity_samples():
+    assert_parity(PARITY_SAMPLES)
+
+
+def test_parity_sample_data():
+    assert_parity(sample_data())
+
+
+@pytest.mark.parametrize('seed', [RANDOM_SEED, RANDOM_SEED + 1])
+def test_parity_random_lexicon_sentences(seed):
+    assert_parity(random_sentences(RANDOM_SENTENCES, seed))
+
+
+def test_batch_matches_single_texts():
+    texts = random_sentences(50)
+    polarity, subjectivity, _ = get_lexicon().score_batch(texts)
+    for index, text in enumerate(texts):
+        p, s, _ = get_lexicon().score_batch([text])
+        assert p[0] == pytest.approx(polarity[index], abs=PARITY_TOLERANCE)
+        assert s[0] == pytest.approx(subjectivity[index], abs=PARITY_TOLERANCE)
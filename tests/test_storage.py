@@ -0,0 +1,104 @@
+"""Compact storage must round-trip results and migrate legacy ones safely while the API serves."""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+from bson import ObjectId
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+sys.path.insert(0, str(ROOT / 'backend' / 'benchmarks'))
+
+from memory_db import MemoryDatabase  # noqa: E402
+from storage import decode_result, encode_result, id_filter, id_to_key, migrate  # noqa: E402
+
+USER = "user-1"
+
+
+def make_result(text: str = "I love this great product", sentiment: str = "positive") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": USER,
+        "text": text,
+        "sentiment": sentiment,
+        "polarity": 0.65,
+        "subjectivity": 0.675,
+        "keywords": ["love", "great", "product"],
+        "created_at": "2024-05-01T12:30:45.123000+00:00"
+    }
+
+
+def legacy_doc(result: dict) -> dict:
+    return {"_id": ObjectId(), **encode_result(result, 'legacy')}
+
+
+def seed(results) -> MemoryDatabase:
+    db = MemoryDatabase("test")
+    asyncio.run(db.sentiments.insert_many([legacy_doc(result) for result in results]))
+    return db
+
+
+def stored(db) -> list:
+    return asyncio.run(db.sentiments.find({}).to_list(None))
+
+
+def test_round_trip():
+    for result in (make_result(), make_result("terrible " * 500, "negative"), make_result("", "neutral")):
+        doc = encode_result(result, 'compact')
+        assert decode_result(doc) == {**result, "created_at": "2024-05-01T12:30:45.123+00:00"}
+        assert decode_result(encode_result(result, 'legacy')) == result
+    assert "text_z" in encode_result(make_result("terrible " * 500), 'compact')
+
+
+def test_non_uuid_ids_are_not_keys():
+    assert id_to_key("not-a-uuid") is None
+    assert id_filter("not-a-uuid") == {"id": "not-a-uuid"}
+
+
+def test_migration_converts_and_reruns():
+    results = [make_result() for _ in range(5)]
+    db = seed(results)
+    # An interrupted run left compact copies of two results next to their originals
+    asyncio.run(db.sentiments.insert_many([encode_result(result, 'compact') for result in results[:2]]))
+
+    assert asyncio.run(migrate(db, batch_size=2)) == 5
+    assert asyncio.run(migrate(db, batch_size=2)) == 0
+    docs = stored(db)
+    assert sorted(decode_result(doc)["id"] for doc in docs) == sorted(result["id"] for result in results)
+    assert all("id" not in doc for doc in docs)
+
+
+def test_migration_keeps_non_uuid_ids():
+    odd = {**make_result(), "id": "imported-1"}
+    db = seed([odd, make_result()])
+
+    assert asyncio.run(migrate(db, batch_size=1)) == 1
+    docs = stored(db)
+    assert len(docs) == 2
+    assert [decode_result(doc) for doc in docs if "id" in doc] == [odd]
+
+
+def test_delete_removes_every_copy():
+    result = make_result()
+    db = seed([result])
+    asyncio.run(db.sentiments.insert_one(encode_result(result, 'compact')))
+
+    deleted = asyncio.run(db.sentiments.delete_many({**id_filter(result["id"]), "user_id": USER}))
+    assert deleted.deleted_count == 2
+    assert stored(db) == []
+
+
+def test_delete_during_migration_is_not_undone():
+    results = [make_result() for _ in range(3)]
+    db = seed(results)
+    insert_many = db.sentiments.insert_many
+
+    async def delete_then_insert(documents, ordered=True):
+        # The user deletes a result after the batch was read but before its copies are written
+        await db.sentiments.delete_many({**id_filter(results[0]["id"]), "user_id": USER})
+        return await insert_many(documents, ordered=ordered)
+
+    db.sentiments.insert_many = delete_then_insert
+    assert asyncio.run(migrate(db)) == 2
+    assert sorted(decode_result(doc)["id"] for doc in stored(db)) == sorted(result["id"] for result in results[1:])